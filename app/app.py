@@ -7,11 +7,23 @@ from flask import Flask, render_template, request
 import logging
 from logging import Formatter, FileHandler
 import os, json
+from itertools import islice
 from semsimilar.textprocessor.tokenize import CodeTokenizer
 from semsimilar.similarity_core.corpus.hal import HAL
 from semsimilar.similarity_core.main import ss_similarity
+from semsimilar.similarity_core.scheduler import SearchScheduler
+from semsimilar.similarity_core.early_exit import EarlyExitPolicy
 from semsimilar.model.document import Document
-from semsimilar.model.document_worker import parallel_process
+from semsimilar.model.document_config import DocumentConfig
+from semsimilar.model.query_document import QueryDocument
+from semsimilar.model.document_worker import parallel_process_stream, WorkerPool, spec
+from semsimilar.model.post_loader import count_posts, iter_posts
+from semsimilar.model.ingest_progress import IngestProgress, log_progress
+from semsimilar.model.document_cache import DocumentCache
+from semsimilar.model.corpus import Corpus
+from semsimilar.model.vocabulary import reset_vocabularies
+from semsimilar.warmup import warm_up
+from semsimilar import instrumentation
 import timeit
 
 # ----------------------------------------------------------------------------#
@@ -22,9 +34,6 @@ app = Flask(__name__)
 app.config.from_object('config')
 # db = SQLAlchemy(app)
 
-documents = []
-hal_model = None
-
 # Automatically tear down SQLAlchemy.
 '''
 @app.teardown_request
@@ -66,8 +75,12 @@ def ask():
 def search(query=None):
     if query is None:
         return ""
-    new_document = Document(0, query, "", "")
-    results = ss_similarity(app.documents, new_document, app.hal_model, 10)
+    # Read once, so the request uses one corpus and model even if they are replaced meanwhile
+    scheduler = app.scheduler
+    if request.args.get('debug'):
+        return search_debug(scheduler, query)
+    new_document = QueryDocument(query)
+    results = scheduler.search(new_document, 10)
     query_results = []
     for top_doc, score in results:
         query_results.append(top_doc.title)
@@ -75,6 +88,23 @@ def search(query=None):
     return json.dumps(query_results)
 
 
+def search_debug(scheduler, query):
+    # Searched outside the scheduler so the trace holds the timings of this query only, with Lesk
+    # in this thread so its stages are traced too, and never from the query cache
+    start = timeit.default_timer()
+    options = dict(scheduler.options, pool=None, use_cache=False)
+    with instrumentation.trace() as search_trace:
+        new_document = QueryDocument(query)
+        results = ss_similarity(scheduler.documents, new_document, scheduler.hal_model, 10, **options)
+    debug = search_trace.snapshot()
+    debug["seconds"] = timeit.default_timer() - start
+    debug["partial"] = results.partial
+    query_results = []
+    for top_doc, score in results:
+        query_results.append(top_doc.title)
+    return json.dumps({"results": query_results, "debug": debug})
+
+
 # Error handlers.
 
 @app.errorhandler(500)
@@ -100,21 +130,37 @@ def not_found_error(error):
 
 
 def initialize_corpus(count):
-    Document.set_tokenizer(CodeTokenizer())
-    Document.tags_enabled = True
-    Document.description_enabled = True
-    with open(
-            '/Users/shamal/Documents/IIT/Project/Development/SemSimilar/semsimilar/tests/data/100posts.json') as posts_file:
-        posts = json.loads(posts_file.read())
-
-    new_posts = posts[:1000]
-    posts = None
+    warm_up(app.config['WORDNET_SNAPSHOT'], signature_index=app.config['SIGNATURE_INDEX'])
+    Document.set_config(DocumentConfig(description_enabled=True, tags_enabled=True, tokenizer=CodeTokenizer()))
+    # Kept for later ingests and for searches
+    worker_pool = WorkerPool(snapshot=app.config['WORDNET_SNAPSHOT'], signature_index=app.config['SIGNATURE_INDEX'])
+    path = '/Users/shamal/Documents/IIT/Project/Development/SemSimilar/semsimilar/tests/data/100posts.json'
+    limit = 1000
+
     start = timeit.default_timer()
-    app.documents, texts = parallel_process(new_posts, 3)
-    new_posts = None
-    app.hal_model = HAL(documents=texts)
+    progress = IngestProgress(total=min(count_posts(path), limit), callback=log_progress, interval=5,
+                              path=app.config['INGEST_SUMMARY'])
+    document_cache = DocumentCache(app.config['DOCUMENT_CACHE'])
+    # New or edited posts are disambiguated with the ingestion, so WSD is measured with it and they
+    # are cached with their synsets
+    documents, token_ids = parallel_process_stream(islice(iter_posts(path), limit), 10000, cache=document_cache,
+                                                   progress=progress, pool=worker_pool,
+                                                   disambiguate=app.config['DISAMBIGUATE_CORPUS'])
+    if app.config['DISAMBIGUATE_CORPUS']:
+        # Only documents cached without their synsets are left
+        document_cache.update(worker_pool.disambiguate(documents), spec)
+    early_exit = None
+    if app.config['EARLY_EXIT_MARGIN'] is not None:
+        early_exit = EarlyExitPolicy(app.config['EARLY_EXIT_MARGIN'], app.config['EARLY_EXIT_EXACT_SCORE'])
+    corpus = Corpus(documents)
+    # Queries get their own vocabularies, so their words are not kept with the corpus
+    reset_vocabularies()
+    # Lesk scoring then sends only the rows of the candidates to the workers
+    worker_pool.set_documents(corpus)
+    app.scheduler = SearchScheduler(corpus, HAL(token_ids=token_ids), app.config['SEARCH_BATCH_WINDOW'],
+                                    pool=worker_pool, budget=app.config['SEARCH_BUDGET'],
+                                    max_candidates=app.config['SEARCH_MAX_CANDIDATES'], early_exit=early_exit)
     end = timeit.default_timer()
-    texts = None
     print("---corpus created---")
     print(end - start)
 
@@ -127,7 +173,7 @@ initialize_corpus(100)
 
 # Default port:
 if __name__ == '__main__':
-    app.run()
+    app.run(threaded=True)
 
 # Or specify port manually:
 '''
@@ -5,3 +5,29 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 
 # Enable debug mode.
 DEBUG = False
+
+# Disambiguate with a prebuilt WordNet signature index instead of nltk_lesk (may choose other synsets).
+SIGNATURE_INDEX = True
+
+# Saved WordNet signature index loaded during warm up (created on first start).
+WORDNET_SNAPSHOT = os.path.join(basedir, 'wordnet.index')
+
+# Processed documents kept between restarts.
+DOCUMENT_CACHE = os.path.join(basedir, 'documents.db')
+
+# Disambiguate documents missing from the document cache at startup (False leaves WSD to the first searches).
+DISAMBIGUATE_CORPUS = True
+
+# Machine-readable summary of the last ingestion (throughput, stage timings).
+INGEST_SUMMARY = os.path.join(basedir, 'ingest_summary.json')
+
+# Time budget (seconds) and number of HAL candidates re-ranked with Lesk per search.
+SEARCH_BUDGET = 1.0
+SEARCH_MAX_CANDIDATES = 100
+
+# HAL score margin that lets a search skip Lesk for decisive candidates (None always re-ranks with Lesk).
+EARLY_EXIT_MARGIN = 0.2
+EARLY_EXIT_EXACT_SCORE = 0.95
+
+# Seconds concurrent searches are collected for one batch (0 only batches searches already waiting).
+SEARCH_BATCH_WINDOW = 0.005
@@ -0,0 +1,174 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+
+class LRUCache(object):
+    """Bounded least recently used cache with hit/miss counters
+
+    Entries are evicted in least recently used order once max_size is reached, and after ttl
+    seconds if a ttl is given. The cache can be saved to and loaded from a file so that results
+    survive restarts.
+
+    :param max_size: maximum number of entries (0 disables the cache)
+    :param path: file used to persist the cache
+    :param ttl: seconds an entry stays valid after it is put (None keeps entries until evicted)
+    :type max_size: int
+    :type path: string
+    :type ttl: float
+    :returns: LRU cache
+    :rtype: semsimilar.semsimilar.cache.LRUCache
+
+    **Property**:
+     - max_size
+     - path
+     - ttl
+     - hits
+     - misses
+     - evictions
+     - expirations
+
+    :Example:
+
+    >>> cache = LRUCache(max_size=1000)
+    >>> cache.put(('bank', ('river', 'bank')), 'bank.n.01')
+    >>> cache.get(('bank', ('river', 'bank')))
+    'bank.n.01'
+    """
+    _missing = object()
+
+    def __init__(self, max_size=100000, path=None, ttl=None):
+        self.__max_size = max_size
+        self.__path = path
+        self.__ttl = ttl
+        self.__entries = OrderedDict()
+        self.__expiry = {}
+        self.__lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    @property
+    def max_size(self):
+        return self.__max_size
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def ttl(self):
+        return self.__ttl
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        return key in self.__entries
+
+    def get(self, key, default=None):
+        """Get a cached value and mark it as recently used
+
+        :param key: hashable key
+        :param default: value returned when the key is not cached
+        :returns: cached value or default
+        """
+        with self.__lock:
+            value = self.__entries.pop(key, self._missing)
+            if value is self._missing:
+                self.misses += 1
+                return default
+            if self.__ttl is not None and self.__expiry[key] <= time.time():
+                del self.__expiry[key]
+                self.misses += 1
+                self.expirations += 1
+                return default
+            self.__entries[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Add a value to the cache, evicting the least recently used entry if full
+
+        :param key: hashable key
+        :param value: value to be cached
+        :returns: void
+        """
+        if self.__max_size <= 0:
+            return
+        with self.__lock:
+            self.__entries.pop(key, None)
+            self.__entries[key] = value
+            if self.__ttl is not None:
+                self.__expiry[key] = time.time() + self.__ttl
+            while len(self.__entries) > self.__max_size:
+                evicted, _ = self.__entries.popitem(last=False)
+                self.__expiry.pop(evicted, None)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all the entries and reset the counters"""
+        with self.__lock:
+            self.__entries.clear()
+            self.__expiry.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self):
+        """Get cache statistics
+
+        :returns: hits, misses, evictions, expirations, size, max_size and hit_rate
+        :rtype: dict
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self.__entries),
+            "max_size": self.__max_size,
+            "hit_rate": float(self.hits) / lookups if lookups else 0.0
+        }
+
+    def save(self, path=None):
+        """Write the cached entries to a file
+
+        :param path: file to write (defaults to the path given at creation)
+        :type path: string
+        :returns: void
+        """
+        path = path or self.__path
+        with self.__lock:
+            items = list(self.__entries.items())
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as cache_file:
+            pickle.dump(items, cache_file, pickle.HIGHEST_PROTOCOL)
+        os.rename(temp_path, path)
+
+    def load(self, path=None):
+        """Read entries previously written with save
+
+        :param path: file to read (defaults to the path given at creation)
+        :type path: string
+        :returns: void
+        """
+        path = path or self.__path
+        with open(path, "rb") as cache_file:
+            items = pickle.load(cache_file)
+        for key, value in items:
+            self.put(key, value)
@@ -0,0 +1,253 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+import functools
+import threading
+import timeit
+from collections import defaultdict
+
+# Instrumentation is off by default. While off (and no trace is active in the thread), increment
+# is a flag check and timer returns a shared object with empty __enter__/__exit__, so hot paths
+# pay next to nothing.
+enabled = False
+
+counters = defaultdict(int)
+timings = defaultdict(float)
+calls = defaultdict(int)
+
+_lock = threading.Lock()
+
+# Trace active in each thread (see trace), and the number of traces active in any thread, checked
+# first so the disabled path does not look up the thread-local
+_local = threading.local()
+_tracing = 0
+
+
+def enable():
+    """Start collecting counters and per-stage timings
+
+    :returns: void
+
+    :Example:
+
+    >>> enable()
+    >>> process_documents()
+    >>> snapshot()
+    """
+    global enabled
+    enabled = True
+
+
+def disable():
+    """Stop collecting counters and timings (collected values are kept)"""
+    global enabled
+    enabled = False
+
+
+def reset():
+    """Clear collected counters and timings"""
+    with _lock:
+        counters.clear()
+        timings.clear()
+        calls.clear()
+
+
+def increment(name, value=1):
+    """Add to a counter
+
+    :param name: name of the counter
+    :param value: amount to be added
+    :type name: string
+    :type value: int
+    :returns: void
+    """
+    if enabled:
+        with _lock:
+            counters[name] += value
+    if _tracing:
+        current = getattr(_local, "trace", None)
+        if current is not None:
+            current.counters[name] += value
+
+
+def record(name, seconds):
+    """Add a measured duration to a stage
+
+    :param name: name of the stage
+    :param seconds: time taken
+    :type name: string
+    :type seconds: float
+    :returns: void
+    """
+    with _lock:
+        timings[name] += seconds
+        calls[name] += 1
+
+
+class _Timer(object):
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = timeit.default_timer()
+        return self
+
+    def __exit__(self, *args):
+        _finish(self.name, timeit.default_timer() - self.start)
+
+
+class _NullTimer(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+_null_timer = _NullTimer()
+
+
+def timer(name):
+    """Time a block of code
+
+    :param name: name of the stage
+    :type name: string
+    :returns: context manager
+
+    :Example:
+
+    >>> with timer("wsd"):
+            synsets = get_synsets(tokens, 4)
+    """
+    if enabled or (_tracing and getattr(_local, "trace", None) is not None):
+        return _Timer(name)
+    return _null_timer
+
+
+def timed(name):
+    """Decorator timing every call of a function as a stage
+
+    :param name: name of the stage
+    :type name: string
+    :returns: decorator
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled and (not _tracing or getattr(_local, "trace", None) is None):
+                return function(*args, **kwargs)
+            start = timeit.default_timer()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _finish(name, timeit.default_timer() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def _finish(name, seconds):
+    # Add a timed stage to the collected timings (if enabled) and to the active trace
+    if enabled:
+        record(name, seconds)
+    current = getattr(_local, "trace", None)
+    if current is not None:
+        current.timings[name] += seconds
+        current.calls[name] += 1
+
+
+class Trace(object):
+    """Counters and per-stage timings of the work done in one thread, e.g. one search
+
+    Collected whether or not instrumentation is enabled, while the trace is active (see trace).
+
+    :returns: trace
+    :rtype: semsimilar.semsimilar.instrumentation.Trace
+    """
+
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.timings = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def snapshot(self):
+        """Get the counters and timings collected by the trace
+
+        :returns: counters, and total seconds and number of calls of each stage
+        :rtype: dict
+        """
+        return {
+            "counters": dict(self.counters),
+            "stages": dict((name, {"seconds": self.timings[name], "calls": self.calls[name]})
+                           for name in self.timings)
+        }
+
+
+class _TraceContext(object):
+    __slots__ = ("trace", "previous")
+
+    def __init__(self, trace):
+        self.trace = trace
+
+    def __enter__(self):
+        global _tracing
+        with _lock:
+            _tracing += 1
+        self.previous = getattr(_local, "trace", None)
+        _local.trace = self.trace
+        return self.trace
+
+    def __exit__(self, *args):
+        global _tracing
+        _local.trace = self.previous
+        with _lock:
+            _tracing -= 1
+
+
+def trace(current=None):
+    """Collect the counters and timings of the current thread into a trace
+
+    :param current: trace to collect into (a new trace if None)
+    :type current: semsimilar.semsimilar.instrumentation.Trace
+    :returns: context manager giving the trace
+
+    :Example:
+
+    >>> with trace() as search_trace:
+            results = ss_similarity(corpus, QueryDocument("php session"), hal, 10)
+    >>> search_trace.snapshot()
+    {'counters': {'hal.candidates': 12}, 'stages': {'hal.vectorize': {'seconds': 0.002, 'calls': 1}}}
+    """
+    if current is None:
+        current = Trace()
+    return _TraceContext(current)
+
+
+def snapshot():
+    """Get the collected counters and timings
+
+    :returns: counters, and total seconds and number of calls of each stage
+    :rtype: dict
+
+    :Example:
+
+    >>> snapshot()
+    {'counters': {'lesk.pairs': 120}, 'stages': {'wsd': {'seconds': 0.42, 'calls': 10}}}
+    """
+    with _lock:
+        return {
+            "counters": dict(counters),
+            "stages": dict((name, {"seconds": timings[name], "calls": calls[name]}) for name in timings)
+        }
@@ -1 +1,4 @@
 from semsimilar.model.document import Document
+from semsimilar.model.document_config import DocumentConfig
+from semsimilar.model.corpus import Corpus
+from semsimilar.model.query_document import QueryDocument
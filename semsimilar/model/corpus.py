@@ -0,0 +1,124 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+import itertools
+
+
+class Corpus(object):
+    """Processed documents in the row order of a HAL model
+
+    Keeps the row id -> document id -> Document mapping explicit, so row ids returned by HAL can
+    be resolved without relying on the order the documents were processed in.
+
+    :param documents: processed documents
+    :param texts: stemmed text of each document (same order as documents), built on access if not given
+    :type documents: list<semsimilar.semsimilar.model.document.Document>
+    :type texts: list<string>
+    :returns: corpus
+    :rtype: semsimilar.semsimilar.model.corpus.Corpus
+
+    **Property**:
+     - documents
+     - texts
+     - version (changes whenever a document is added)
+
+    :Example:
+
+    >>> corpus = Corpus(*parallel_process(posts))
+    >>> hal = HAL(documents=corpus.texts)
+    >>> corpus[row].title
+    """
+
+    __versions = itertools.count(1)
+
+    def __init__(self, documents=(), texts=None):
+        self.__version = next(Corpus.__versions)
+        documents = list(documents)
+        self.__documents = []
+        self.__texts = None
+        self.__rows = {}
+        if texts is None:
+            for document in documents:
+                self.add(document)
+            return
+        texts = list(texts)
+        if len(documents) != len(texts):
+            raise ValueError("Got %s documents and %s texts" % (len(documents), len(texts)))
+        self.__texts = []
+        for document, text in zip(documents, texts):
+            self.add(document, text)
+
+    @property
+    def documents(self):
+        return self.__documents
+
+    @property
+    def version(self):
+        return self.__version
+
+    @property
+    def texts(self):
+        if self.__texts is None:
+            return [" ".join(document.stemmed_tokens) for document in self.__documents]
+        return self.__texts
+
+    def __len__(self):
+        return len(self.__documents)
+
+    def __iter__(self):
+        return iter(self.__documents)
+
+    def __getitem__(self, row):
+        return self.__documents[row]
+
+    def __contains__(self, document_id):
+        return document_id in self.__rows
+
+    def add(self, document, text=None):
+        """Add a document as the next row
+
+        :param document: processed document
+        :param text: stemmed text (defaults to the stemmed tokens of the document, if texts are kept)
+        :type document: semsimilar.semsimilar.model.document.Document
+        :type text: string
+        :returns: row id of the document
+        :rtype: int
+        """
+        if document.id in self.__rows:
+            raise ValueError("Document %s is already in the corpus" % document.id)
+        row = len(self.__documents)
+        self.__documents.append(document)
+        if self.__texts is not None:
+            if text is None:
+                text = " ".join(document.stemmed_tokens)
+            self.__texts.append(text)
+        self.__rows[document.id] = row
+        self.__version = next(Corpus.__versions)
+        return row
+
+    def get_row(self, document_id):
+        """Get the row id of a document
+
+        :param document_id: id of the document
+        :returns: row id or None
+        :rtype: int
+        """
+        return self.__rows.get(document_id)
+
+    def get_document(self, document_id):
+        """Get a document by its id
+
+        :param document_id: id of the document
+        :returns: document or None
+        :rtype: semsimilar.semsimilar.model.document.Document
+        """
+        row = self.__rows.get(document_id)
+        if row is None:
+            return None
+        return self.__documents[row]
@@ -7,24 +7,38 @@ __license__ = "GPL"
 __version__ = "1.0.0"
 __email__ = "uslperera@gmail.com"
 
-import logging
+from array import array
 from nltk.tokenize.api import TokenizerI
+from semsimilar import instrumentation
 from semsimilar.textprocessor.wsd import get_synsets
-from semsimilar.textprocessor.processor import remove_custom_words, stem_tokens, remove_stopwords
+from semsimilar.model.document_config import DocumentConfig
+from semsimilar.model.vocabulary import get_vocabularies
 
 
 class Document(object):
     """
     Document class includes the basic skeleton to keep all the data associated with posts or articles.
 
+    Tokens and synsets are stored as arrays of ids interned in vocabularies shared with the other
+    documents (see semsimilar.semsimilar.model.vocabulary.get_vocabularies) and converted back to
+    words when accessed, so read a property once when it is used many times. They are
+    generated on first access: tokens, stemmed tokens and synset tokens together, synsets (WSD)
+    only when needed.
+
+    A document is processed with the configuration it was created with, or else the class-level
+    configuration (see get_config) at the time its tokens are first generated. It keeps that
+    configuration, so changing the class-level settings later does not affect it.
+
     :param id: unique number of the document
     :param title: title of the document
     :param description: description of the document
     :param tags: tags of the document
+    :param config: configuration used to process the document
     :type id: int
     :type title: string
     :type description: string
     :type tags: string
+    :type config: semsimilar.semsimilar.model.document_config.DocumentConfig
     :returns: Document model
     :rtype: semsimilar.semsimilar.model.document.Document
 
@@ -37,12 +51,16 @@ class Document(object):
      - stemmed_tokens
      - tokens
      - synsets (Get synsets of the tokens including Description)
+     - config
+     - processed
+     - disambiguated
 
     **Setter**
      - id
      - title
      - description
      - tags
+     - synsets
 
 
     :Example:
@@ -52,31 +70,22 @@ class Document(object):
     responsible session security with PHP",
      "<security><php>")
     """
-    __id = None
-    __title = None
-    __description = None
-    __tags = None
-    __tokens = None
-    __synsets = None
-    __stemmed_tokens = None
-    __tokenizer = None
-    __window = 4
+    __slots__ = ('__id', '__title', '__description', '__tags', '__tokens', '__stemmed_tokens', '__synset_tokens',
+                 '__synsets', '__config', '__vocabularies')
+
+    # Class-level configuration, replaced (never changed) when a setting changes
+    __default_config = None
     title_enabled = True
     description_enabled = tags_enabled = False
-    __synset_tokens = None
-
-    __logger = None
-
-    def __init__(self, id, title, description, tags):
-        self.__logger = logging.getLogger(__name__)
-        self.__logger.info("Started creating document with id %s", id)
 
+    def __init__(self, id, title, description, tags, config=None):
         self.__id = id
         self.__title = title
         self.__description = description
         self.__tags = tags
-        self.generate_tokens()
-        self.__logger.info("Finished creating document with id %s", id)
+        self.__config = config
+        self.__vocabularies = None
+        self.invalidate()
 
     @property
     def id(self):
@@ -93,6 +102,7 @@ class Document(object):
     @title.setter
     def title(self, title):
         self.__title = title
+        self.invalidate()
 
     @property
     def description(self):
@@ -101,6 +111,7 @@ class Document(object):
     @description.setter
     def description(self, description):
         self.__description = description
+        self.invalidate()
 
     @property
     def tags(self):
@@ -109,23 +120,93 @@ class Document(object):
     @tags.setter
     def tags(self, tags):
         self.__tags = tags
+        self.invalidate()
 
     @property
     def synset_tokens(self):
-        return self.__synset_tokens
+        if self.__synset_tokens is None:
+            self.generate_tokens()
+        return self.__vocabularies[0].decode(self.__synset_tokens)
 
     @property
     def stemmed_tokens(self):
-        return self.__stemmed_tokens
+        if self.__stemmed_tokens is None:
+            self.generate_tokens()
+        return self.__vocabularies[0].decode(self.__stemmed_tokens)
 
     @property
     def tokens(self):
-        return self.__tokens
+        if self.__tokens is None:
+            self.generate_tokens()
+        return self.__vocabularies[0].decode(self.__tokens)
 
     @property
     def synsets(self):
-        return self.__synsets
+        if self.__synsets is None:
+            self.generate_synsets()
+        return self.__vocabularies[1].decode(self.__synsets)
 
+    @synsets.setter
+    def synsets(self, synsets):
+        # Synsets disambiguated elsewhere (e.g. by a worker pool) for the current synset tokens
+        if self.__tokens is None:
+            self.generate_tokens()
+        self.__synsets = self.__vocabularies[1].encode(synsets)
+
+    @property
+    def config(self):
+        """Configuration the document is processed with"""
+        if self.__config is None:
+            return Document.get_config()
+        return self.__config
+
+    @property
+    def processed(self):
+        """Whether the tokens have been generated"""
+        return self.__tokens is not None
+
+    @property
+    def disambiguated(self):
+        """Whether the synsets have been generated"""
+        return self.__synsets is not None
+
+    def __getstate__(self):
+        # Ids are only valid in the process that interned them, so documents travel as words. A
+        # document with the class-level configuration takes the one of the process it is loaded in
+        # (worker pools share it), so pickles do not carry a pipeline per document
+        config = self.__config
+        if config is Document.__default_config:
+            config = None
+        token_vocabulary, synset_vocabulary = self.__vocabularies or (None, None)
+        return (self.__id, self.__title, self.__description, self.__tags,
+                self.__decode(token_vocabulary, self.__tokens),
+                self.__decode(token_vocabulary, self.__stemmed_tokens),
+                self.__decode(token_vocabulary, self.__synset_tokens),
+                self.__decode(synset_vocabulary, self.__synsets), config)
+
+    def __setstate__(self, state):
+        if len(state) == 8:
+            # Pickled before documents kept their configuration
+            state = tuple(state) + (None,)
+        (self.__id, self.__title, self.__description, self.__tags, tokens, stemmed_tokens, synset_tokens, synsets,
+         self.__config) = state
+        token_vocabulary, synset_vocabulary = self.__vocabularies = get_vocabularies()
+        self.__tokens = self.__encode(token_vocabulary, tokens)
+        self.__stemmed_tokens = self.__encode(token_vocabulary, stemmed_tokens)
+        self.__synset_tokens = self.__encode(token_vocabulary, synset_tokens)
+        self.__synsets = self.__encode(synset_vocabulary, synsets)
+
+    @staticmethod
+    def __decode(vocabulary, ids):
+        if ids is None:
+            return None
+        return vocabulary.decode(ids)
+
+    @staticmethod
+    def __encode(vocabulary, words):
+        if words is None:
+            return None
+        return vocabulary.encode(words)
 
     @staticmethod
     def set_window(window):
@@ -143,7 +224,16 @@ class Document(object):
         >>> Document.set_window(4)
         """
         if window > 1 & window % 2 == 0:
-            Document.__window = window
+            Document.__default_config = Document.get_config().replace(window=window)
+
+    @staticmethod
+    def get_window():
+        """Get the size of the window used for word sense disambiguation
+
+        :returns: size of the window
+        :rtype: int
+        """
+        return Document.get_config().window
 
     @staticmethod
     def set_tokenizer(tokenizer):
@@ -161,7 +251,92 @@ class Document(object):
         >>> Document.set_tokenizer(CodeTokenizer())
         """
         if isinstance(tokenizer, TokenizerI):
-            Document.__tokenizer = tokenizer
+            Document.__default_config = Document.get_config().replace(tokenizer=tokenizer)
+
+    @staticmethod
+    def get_tokenizer():
+        """Get the tokenizer used to extract words
+
+        :returns: tokenizer object or None
+        :rtype: semsimilar.semsimilar.textprocessor.tokenize.CodeTokenizer, nltk.tokenize.api.* ,...
+        """
+        return Document.get_config().tokenizer
+
+    @staticmethod
+    def get_pipeline():
+        """Get the text pipeline of the tokenizer (a default pipeline if no tokenizer is set)
+
+        :returns: text pipeline
+        :rtype: semsimilar.semsimilar.textprocessor.pipeline.TextPipeline
+        """
+        return Document.get_config().pipeline
+
+    @staticmethod
+    def set_config(config):
+        """
+        Set the configuration used to process documents created without one
+
+        Documents already processed keep the configuration they were processed with.
+
+        :param config: document configuration
+        :type config: semsimilar.semsimilar.model.document_config.DocumentConfig
+        :returns: void
+
+        :Example:
+
+        >>> Document.set_config(DocumentConfig(description_enabled=True, tokenizer=CodeTokenizer()))
+        """
+        Document.title_enabled = config.title_enabled
+        Document.description_enabled = config.description_enabled
+        Document.tags_enabled = config.tags_enabled
+        Document.__default_config = config
+
+    @staticmethod
+    def get_config():
+        """Get the configuration used to process documents created without one
+
+        The title_enabled, description_enabled and tags_enabled class attributes are applied.
+
+        :returns: document configuration
+        :rtype: semsimilar.semsimilar.model.document_config.DocumentConfig
+        """
+        config = Document.__default_config
+        components = (Document.title_enabled, Document.description_enabled, Document.tags_enabled)
+        if config is None:
+            config = Document.__default_config = DocumentConfig(*components)
+        elif (config.title_enabled, config.description_enabled, config.tags_enabled) != components:
+            config = Document.__default_config = config.replace(title_enabled=components[0],
+                                                                description_enabled=components[1],
+                                                                tags_enabled=components[2])
+        return config
+
+    def invalidate(self):
+        """Discard the tokens and synsets so they are generated again on next access
+
+        .. note:: Called automatically when the title, description or tags are changed.
+
+        :returns: void
+
+        :Example:
+
+        >>> doc.invalidate()
+        """
+        self.__tokens = self.__stemmed_tokens = self.__synset_tokens = None
+        self.__synsets = None
+
+    @staticmethod
+    def settings():
+        """Get the class-level settings that affect the tokens and synsets of documents
+
+        :returns: enabled components, window, tokenizer and pipeline version
+        :rtype: tuple
+
+        :Example:
+
+        >>> Document.settings()
+        (True, True, True, 4, 'CodeTokenizer', 1)
+        """
+        return Document.get_config().settings()
 
     def remove_special_words(self, words):
         """Remove special words from the tokens of the document
@@ -171,17 +346,19 @@ class Document(object):
         :Example:
 
         >>> doc = Document(101, "PHP Session Security <duplicate>", None, None)
-        >>> doc.generate_tokens()
         >>> doc.remove_special_words(["duplicate"])
         """
-        self.__tokens = remove_custom_words(words, self.__tokens)
-        self.__synsets = get_synsets(self.__synset_tokens, self.__window)
-        self.__stemmed_tokens = stem_tokens(self.__tokens)
+        if self.__tokens is None:
+            self.generate_tokens()
+        words = frozenset(words)
+        kept = [index for index, token in enumerate(self.tokens) if token not in words]
+        self.__tokens = array('i', [self.__tokens[index] for index in kept])
+        self.__stemmed_tokens = array('i', [self.__stemmed_tokens[index] for index in kept])
 
     def generate_tokens(self):
         """Tokenize the document based on selected components (title | description | tags)
 
-        .. note:: This function is automatically called during a document creation. Can be called if content of the document is changed.
+        .. note:: Called automatically on first access of the tokens. Synsets are generated separately on first access of synsets.
 
         :returns: void
 
@@ -190,32 +367,32 @@ class Document(object):
         >>> doc = Document(101, "PHP Session Security", None, None)
         >>> doc.generate_tokens()
         """
-        self.__logger.info("NLP processing started")
-        self.__tokens = []
-        if self.title_enabled & self.description_enabled & self.tags_enabled:
-            text = self.__title + " " + self.__description + " " + self.__tags
-            self.__synset_tokens = self.__tokenizer.tokenize((self.__title + " " + self.__tags).lower())
-        elif self.title_enabled & self.description_enabled:
-            text = self.__title + " " + self.__description
-            self.__synset_tokens = self.__tokenizer.tokenize(self.__title.lower())
-        elif self.title_enabled & self.tags_enabled:
-            text = self.__title + " " + self.__tags
-            self.__synset_tokens = self.__tokenizer.tokenize((self.__title + " " + self.__tags).lower())
-        else:
-            text = self.__title
-            self.__synset_tokens = self.__tokenizer.tokenize(self.__title.lower())
-
-        tokens = self.__tokenizer.tokenize(text.lower())
-        self.__logger.debug("Tokens %s", tokens)
-        self.__tokens = remove_stopwords(tokens)
-        self.__logger.debug("Tokens after stop words are removed %s", self.__tokens)
-
-        # synset_tokens = remove_stopwords(self.__synset_tokens)
-        synset_tokens = remove_stopwords(self.__tokens)
-        self.__synset_tokens = list(set(synset_tokens))
-        self.__logger.debug("Synset tokens %s", self.__synset_tokens)
-        self.__synsets = get_synsets(self.__synset_tokens, self.__window)
-        self.__logger.debug("Synsets %s", self.__synsets)
-        self.__stemmed_tokens = stem_tokens(self.__tokens)
-        self.__logger.debug("Stemmed tokens %s", self.__stemmed_tokens)
-        self.__logger.info("Finished processing the document")
+        if self.__config is None:
+            self.__config = Document.get_config()
+        config = self.__config
+
+        tokens, stemmed_tokens, synset_tokens = config.pipeline.process(
+            config.text(self.__title, self.__description, self.__tags))
+        self.__synsets = None
+        self.__vocabularies = token_vocabulary, synset_vocabulary = get_vocabularies()
+        self.__synset_tokens = token_vocabulary.encode(synset_tokens)
+        self.__stemmed_tokens = token_vocabulary.encode(stemmed_tokens)
+        self.__tokens = token_vocabulary.encode(tokens)
+        instrumentation.increment("documents")
+
+    def generate_synsets(self):
+        """Disambiguate the synset tokens of the document
+
+        .. note:: Called automatically on first access of synsets. Can be called to disambiguate documents ahead of searches.
+        .. note:: Disambiguate documents shared by concurrent searches ahead of them, so searches only read them.
+
+        :returns: void
+
+        :Example:
+
+        >>> doc = Document(101, "PHP Session Security", None, None)
+        >>> doc.generate_synsets()
+        """
+        synset_tokens = self.synset_tokens
+        with instrumentation.timer("wsd"):
+            self.__synsets = self.__vocabularies[1].encode(get_synsets(synset_tokens, self.config.window))
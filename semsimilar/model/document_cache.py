@@ -0,0 +1,139 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+import hashlib
+import logging
+import sqlite3
+import zlib
+from semsimilar.model.document import Document
+from semsimilar.textprocessor import wsd
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentCache(object):
+    """On-disk cache of processed documents addressed by their content
+
+    Documents are stored in a SQLite file under a hash of their title, description, tags, the
+    custom words removed, the Document settings (enabled components, window, tokenizer and
+    pipeline version) and the disambiguator, so edited posts and changed settings miss the cache
+    by themselves.
+    Documents are stored as processed at ingestion, and can be stored again with their synsets
+    (see update) so WSD is not repeated after a restart. Cached documents are shared by posts
+    with the same content and carry the id of the post they were stored for.
+
+    :param path: SQLite file
+    :type path: string
+    :returns: document cache
+    :rtype: semsimilar.semsimilar.model.document_cache.DocumentCache
+
+    :Example:
+
+    >>> cache = DocumentCache("documents.db")
+    >>> parallel_process(posts, 4, cache=cache)
+    """
+
+    def __init__(self, path):
+        self.__path = path
+        self.__connection = sqlite3.connect(path)
+        self.__connection.execute("CREATE TABLE IF NOT EXISTS documents (key TEXT PRIMARY KEY, data BLOB)")
+        self.__connection.commit()
+        self.hits = self.misses = 0
+
+    @property
+    def path(self):
+        return self.__path
+
+    def __len__(self):
+        return self.__connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    @staticmethod
+    def key(title, description, tags, custom_words=(), settings=None):
+        """Get the cache key of a document's content with the given or current Document settings
+
+        The current disambiguator (see semsimilar.semsimilar.textprocessor.wsd.set_disambiguator) is
+        part of the key, as the synsets of cached documents depend on it.
+
+        :param title: title of the document
+        :param description: description of the document
+        :param tags: tags of the document
+        :param custom_words: words removed from the tokens
+        :param settings: settings of the document configuration (defaults to Document.settings())
+        :type title: string
+        :type description: string
+        :type tags: string
+        :type custom_words: list<string>
+        :type settings: tuple
+        :returns: hex digest
+        :rtype: string
+        """
+        if settings is None:
+            settings = Document.settings()
+        content = u"\x1f".join([repr(settings), wsd.get_disambiguator_name(), u" ".join(sorted(custom_words)),
+                                title or u"", description or u"", tags or u""])
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        """Get cached documents
+
+        :param keys: cache keys
+        :type keys: list<string>
+        :returns: documents found, by key
+        :rtype: dict<string, semsimilar.semsimilar.model.document.Document>
+        """
+        documents = {}
+        keys = list(keys)
+        # Stay below SQLite's limit of 999 parameters per statement
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self.__connection.execute(
+                "SELECT key, data FROM documents WHERE key IN (%s)" % ",".join("?" * len(batch)), batch)
+            for key, data in rows:
+                documents[key] = pickle.loads(zlib.decompress(bytes(data)))
+        self.hits += len(documents)
+        self.misses += len(keys) - len(documents)
+        logger.debug("Document cache hits %s misses %s", len(documents), len(keys) - len(documents))
+        return documents
+
+    def put_many(self, items):
+        """Store processed documents
+
+        :param items: cache keys and documents
+        :type items: list<(string, semsimilar.semsimilar.model.document.Document)>
+        :returns: void
+        """
+        rows = [(key, sqlite3.Binary(zlib.compress(pickle.dumps(document, pickle.HIGHEST_PROTOCOL))))
+                for key, document in items]
+        self.__connection.executemany("INSERT OR REPLACE INTO documents (key, data) VALUES (?, ?)", rows)
+        self.__connection.commit()
+
+    def update(self, documents, custom_words=()):
+        """Store documents again under the key of their content, e.g. once they are disambiguated
+
+        :param documents: processed documents
+        :param custom_words: words removed from the tokens (as given to key)
+        :type documents: list<semsimilar.semsimilar.model.document.Document>
+        :type custom_words: list<string>
+        :returns: void
+
+        :Example:
+
+        >>> cache.update(pool.disambiguate(documents), spec)
+        """
+        self.put_many([(self.key(document.title, document.description, document.tags, custom_words,
+                                 document.config.settings()), document) for document in documents])
+
+    def close(self):
+        """Close the SQLite file"""
+        self.__connection.close()
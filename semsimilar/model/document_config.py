@@ -0,0 +1,151 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+from semsimilar.textprocessor.pipeline import TextPipeline
+
+
+class DocumentConfig(object):
+    """Settings used to process documents: components of the text, WSD window and text pipeline
+
+    A configuration can not be changed once created, so documents and queries holding one are
+    processed the same way whatever other threads do. Use replace to get a changed copy.
+
+    :param title_enabled: use the title
+    :param description_enabled: use the description
+    :param tags_enabled: use the tags
+    :param window: size of the window used for word sense disambiguation
+    :param tokenizer: tokenizer object (the default tokenizer of TextPipeline if None)
+    :param pipeline: text pipeline (created from the tokenizer if None)
+    :type title_enabled: bool
+    :type description_enabled: bool
+    :type tags_enabled: bool
+    :type window: int
+    :type tokenizer: semsimilar.semsimilar.textprocessor.tokenize.CodeTokenizer, nltk.tokenize.api.* ,...
+    :type pipeline: semsimilar.semsimilar.textprocessor.pipeline.TextPipeline
+    :returns: document configuration
+    :rtype: semsimilar.semsimilar.model.document_config.DocumentConfig
+
+    **Property**:
+     - title_enabled
+     - description_enabled
+     - tags_enabled
+     - window
+     - tokenizer
+     - pipeline
+
+    :Example:
+
+    >>> config = DocumentConfig(description_enabled=True, tags_enabled=True, tokenizer=CodeTokenizer())
+    >>> QueryDocument("php session", config=config.replace(window=6))
+    """
+    __slots__ = ('__title_enabled', '__description_enabled', '__tags_enabled', '__window', '__tokenizer',
+                 '__pipeline')
+
+    def __init__(self, title_enabled=True, description_enabled=False, tags_enabled=False, window=4,
+                 tokenizer=None, pipeline=None):
+        if pipeline is None:
+            pipeline = TextPipeline(tokenizer)
+        self.__title_enabled = title_enabled
+        self.__description_enabled = description_enabled
+        self.__tags_enabled = tags_enabled
+        self.__window = window
+        self.__tokenizer = tokenizer
+        self.__pipeline = pipeline
+
+    @property
+    def title_enabled(self):
+        return self.__title_enabled
+
+    @property
+    def description_enabled(self):
+        return self.__description_enabled
+
+    @property
+    def tags_enabled(self):
+        return self.__tags_enabled
+
+    @property
+    def window(self):
+        return self.__window
+
+    @property
+    def tokenizer(self):
+        return self.__tokenizer
+
+    @property
+    def pipeline(self):
+        return self.__pipeline
+
+    def replace(self, **changes):
+        """Get a copy of the configuration with some settings changed
+
+        The pipeline is kept unless the tokenizer or the pipeline is changed.
+
+        :param changes: settings to change (same names as the constructor arguments)
+        :returns: new configuration
+        :rtype: semsimilar.semsimilar.model.document_config.DocumentConfig
+
+        :Example:
+
+        >>> config.replace(tags_enabled=True)
+        """
+        settings = {
+            "title_enabled": self.__title_enabled,
+            "description_enabled": self.__description_enabled,
+            "tags_enabled": self.__tags_enabled,
+            "window": self.__window,
+            "tokenizer": self.__tokenizer,
+            "pipeline": self.__pipeline
+        }
+        if "tokenizer" in changes and "pipeline" not in changes:
+            settings["pipeline"] = None
+        settings.update(changes)
+        return DocumentConfig(**settings)
+
+    def text(self, title, description, tags):
+        """Join the enabled components of a document
+
+        :param title: title of the document
+        :param description: description of the document
+        :param tags: tags of the document
+        :type title: string
+        :type description: string
+        :type tags: string
+        :returns: text to be processed
+        :rtype: string
+        """
+        if self.__title_enabled & self.__description_enabled & self.__tags_enabled:
+            return title + " " + description + " " + tags
+        elif self.__title_enabled & self.__description_enabled:
+            return title + " " + description
+        elif self.__title_enabled & self.__tags_enabled:
+            return title + " " + tags
+        return title
+
+    def settings(self):
+        """Get the values that affect the tokens and synsets of documents
+
+        :returns: enabled components, window, tokenizer and pipeline version
+        :rtype: tuple
+
+        :Example:
+
+        >>> config.settings()
+        (True, True, True, 4, 'CodeTokenizer', 1)
+        """
+        return (self.__title_enabled, self.__description_enabled, self.__tags_enabled, self.__window,
+                type(self.__tokenizer).__name__, TextPipeline.version)
+
+    def __getstate__(self):
+        return (self.__title_enabled, self.__description_enabled, self.__tags_enabled, self.__window,
+                self.__tokenizer, self.__pipeline)
+
+    def __setstate__(self, state):
+        (self.__title_enabled, self.__description_enabled, self.__tags_enabled, self.__window, self.__tokenizer,
+         self.__pipeline) = state
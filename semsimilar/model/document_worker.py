@@ -7,9 +7,24 @@ __license__ = "GPL"
 __version__ = "1.0.0"
 __email__ = "uslperera@gmail.com"
 
+import collections
+import copy
+import functools
+import itertools
 import logging
 import multiprocessing
+import os
+import tempfile
+import threading
+import timeit
+import numpy as np
+from semsimilar import instrumentation
+from semsimilar.similarity_core.knowledge import lesk
+from semsimilar.similarity_core.results import SearchResults
+from semsimilar.textprocessor import wsd
+from semsimilar.warmup import warm_up
 from semsimilar.model.document import Document
+from semsimilar.model.vocabulary import Vocabulary, TokenIds
 from semsimilar.exceptions import InvalidProcessorCount
 
 ID_KEY = "Id"
@@ -17,51 +32,556 @@ TITLE_KEY = "Title"
 DESCRIPTION_KEY = "Body"
 TAGS_KEY = "Tags"
 
-lock = multiprocessing.Lock()
+logger = logging.getLogger(__name__)
+
+# Number of posts handed to a worker at a time
+CHUNK_SIZE = 50
 
 spec = ['p', '&#xa', '&#xd', 'pre', 'code', 'blockquote', 'strong', 'ul', 'li', 'a', 'href', 'em']
 
+# Documents preloaded in a worker process (see WorkerPool.set_documents)
+_documents = None
 
-def append_documents(documents, texts, final_documents, final_texts):
-    """Add documents to the array"""
-    logger = logging.getLogger(__name__)
-    logger.debug("Acquire lock")
-    lock.acquire()
-    final_documents.extend(documents)
-    final_texts.extend(texts)
-    lock.release()
-    logger.debug("Release lock")
 
+def create_documents(posts):
+    """Create documents from posts and remove the special words
 
-def worker(posts, final_documents, final_texts):
-    """Worker process to process documents"""
-    logger = logging.getLogger(__name__)
-    logger.info("Processing documents started")
+    :param posts: posts, articles
+    :type posts: list<key-value object>
+    :returns: documents
+    :rtype: list<semsimilar.semsimilar.model.document.Document>
+    """
     documents = []
     for post in posts:
         d = Document(post[ID_KEY], post[TITLE_KEY], post[DESCRIPTION_KEY], post[TAGS_KEY])
         d.remove_special_words(spec)
         documents.append(d)
-        # documents.append(Document(post[ID_KEY], post[TITLE_KEY], post[DESCRIPTION_KEY], post[TAGS_KEY]))
+    return documents
+
+
+def worker(posts):
+    """Worker process to process documents
+
+    :param posts: posts, articles
+    :type posts: list<key-value object>
+    :returns: Processed documents and their stemmed texts
+    :rtype: (list<semsimilar.semsimilar.model.document.Document>, list<string>)
+    """
+    logger.info("Processing documents started")
+    documents = create_documents(posts)
 
     texts = []
     for doc in documents:
         texts.append(" ".join(doc.stemmed_tokens))
     logger.info("Processing documents finished")
-    append_documents(documents, texts, final_documents, final_texts)
-    return
+    return documents, texts
+
+
+def disambiguated_documents(posts):
+    """Worker task creating documents (see create_documents) and disambiguating them
+
+    :param posts: posts, articles
+    :type posts: list<key-value object>
+    :returns: documents with their synsets
+    :rtype: list<semsimilar.semsimilar.model.document.Document>
+    """
+    documents = create_documents(posts)
+    for document in documents:
+        document.generate_synsets()
+    return documents
+
+
+def measured_task(task, posts):
+    """Run a worker task over a chunk of posts and measure it for IngestProgress
+
+    :param task: worker task (worker, create_documents or disambiguated_documents)
+    :param posts: posts, articles
+    :type task: function
+    :type posts: list<key-value object>
+    :returns: result of the task, and the worker, number of documents, seconds and stage timings
+    :rtype: (tuple, dict)
+    """
+    # Traced apart from the counters of the process, which other tasks of the worker may be using
+    start = timeit.default_timer()
+    with instrumentation.trace() as task_trace:
+        result = task(posts)
+    stats = {
+        "worker": multiprocessing.current_process().name,
+        "documents": len(posts),
+        "seconds": timeit.default_timer() - start,
+        "stages": task_trace.snapshot()["stages"]
+    }
+    return result, stats
+
+
+def chunk_posts(posts, chunk_size):
+    """Split posts into consecutive chunks
+
+    :param posts: posts, articles
+    :param chunk_size: number of posts in a chunk
+    :type posts: list<key-value object>
+    :type chunk_size: int
+    :returns: chunks of posts
+    :rtype: generator<list<key-value object>>
+    """
+    for start in range(0, len(posts), chunk_size):
+        yield posts[start:start + chunk_size]
+
+
+def batch_posts(posts, batch_size):
+    """Group a stream of posts into lists
+
+    :param posts: posts, articles
+    :param batch_size: number of posts in a batch
+    :type posts: iterable<key-value object>
+    :type batch_size: int
+    :returns: batches of posts
+    :rtype: generator<list<key-value object>>
+    """
+    batch = []
+    for post in posts:
+        batch.append(post)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def warm_worker(config, snapshot, warm, documents=None, signature_index=False):
+    """Initializer of WorkerPool processes: apply the Document configuration, warm up NLTK and keep the documents
+
+    :param config: configuration of Document
+    :param snapshot: file holding a saved signature index (see semsimilar.semsimilar.warmup.warm_up)
+    :param warm: load WordNet, stop words and stemmers
+    :param documents: documents scored by row with lesk_rows_worker
+    :param signature_index: use the signature index as the WSD disambiguator (when warm)
+    :type config: semsimilar.semsimilar.model.document_config.DocumentConfig
+    :type snapshot: string
+    :type warm: bool
+    :type documents: semsimilar.semsimilar.model.corpus.Corpus, list<semsimilar.semsimilar.model.document.Document>
+    :type signature_index: bool
+    :returns: void
+    """
+    global _documents
+    Document.set_config(config)
+    _documents = documents
+    if warm:
+        warm_up(snapshot, signature_index)
+
+
+def disambiguate_worker(documents):
+    """Worker task disambiguating documents
+
+    :param documents: documents
+    :type documents: list<semsimilar.semsimilar.model.document.Document>
+    :returns: synsets of each document
+    :rtype: list<list<string>>
+    """
+    return [document.synsets for document in documents]
+
+
+def lesk_worker(new_document, count, documents):
+    """Worker task finding the documents most similar to a document with Lesk
+
+    :param new_document: document to search
+    :param count: number of results wanted
+    :param documents: documents to compare with
+    :type new_document: semsimilar.semsimilar.model.document.Document
+    :type count: int
+    :type documents: list<semsimilar.semsimilar.model.document.Document>
+    :returns: position of the top matched documents in documents with their scores
+    :rtype: list<(int, float)>
+    """
+    positions = dict((id(document), position) for position, document in enumerate(documents))
+    return [(positions[id(document)], score)
+            for document, score in lesk.similarity(documents=documents, new_document=new_document, count=count)]
+
+
+def lesk_rows_worker(new_document, count, rows):
+    """Worker task finding the documents most similar to a document among the preloaded documents
+
+    Preloaded documents keep the synsets generated in the worker, so they are disambiguated once.
+
+    :param new_document: document to search
+    :param count: number of results wanted
+    :param rows: rows of the documents to compare with in the preloaded documents
+    :type new_document: semsimilar.semsimilar.model.document.Document
+    :type count: int
+    :type rows: list<int>
+    :returns: position of the top matched documents in rows with their scores
+    :rtype: list<(int, float)>
+    """
+    return lesk_worker(new_document, count, [_documents[row] for row in rows])
+
+
+class WorkerPool(object):
+    """Long-lived pool of warm worker processes
+
+    Worker processes are started once, with the tokenizer and settings of Document, and load
+    WordNet, stop words, stemmers and (with signature_index) the WSD index when they start. The same pool can then be
+    used by every ingest (pool argument of parallel_process, parallel_process_token_ids and
+    parallel_process_stream), to disambiguate queries and documents, and for Lesk scoring, without
+    paying the startup cost again. Processes are started on first use and restarted if the
+    Document settings change. A pool can be used from many threads at once. Documents searched
+    often (the corpus) can be preloaded in the worker processes with set_documents, so Lesk
+    scoring sends only their rows.
+
+    :param processors: number of processors (defaults to all of them)
+    :param snapshot: file holding a saved signature index (see semsimilar.semsimilar.warmup.warm_up), built
+                     once for the workers in a temporary file if None
+    :param warm: warm up the worker processes when they start
+    :param signature_index: warm workers disambiguate with the signature index instead of nltk_lesk (use the
+                            same disambiguator as the calling process)
+    :type processors: int
+    :type snapshot: string
+    :type warm: bool
+    :type signature_index: bool
+    :returns: worker pool
+    :rtype: semsimilar.semsimilar.model.document_worker.WorkerPool
+
+    :Example:
+
+    >>> pool = WorkerPool(4, "wordnet.index", signature_index=True)
+    >>> documents, token_ids = parallel_process_token_ids(posts, pool=pool)
+    >>> pool.set_documents(corpus)
+    >>> pool.similarity(corpus[:10], Document(0, "php session", "", ""), 10)
+    >>> pool.close()
+    """
+
+    def __init__(self, processors=None, snapshot=None, warm=True, signature_index=False):
+        if processors is None:
+            processors = multiprocessing.cpu_count()
+        if 1 > processors or multiprocessing.cpu_count() < processors:
+            raise InvalidProcessorCount("Processor count " + str(processors) + " is invalid")
+        self.__processors = processors
+        self.__snapshot = snapshot
+        self.__temporary_snapshot = None
+        self.__warm = warm
+        self.__signature_index = signature_index
+        self.__pool = None
+        self.__settings = None
+        # Preloaded documents and the row of each (by object id), replaced together
+        self.__preloaded = (None, None)
+        self.__lock = threading.Lock()
+        # Held while the signature index is built, so other pool operations are not blocked
+        self.__snapshot_lock = threading.Lock()
+
+    @property
+    def processors(self):
+        return self.__processors
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
+    def start(self):
+        """Start the worker processes (if not running with the current Document settings)
 
-def parallel_process(posts, processors):
+        :returns: void
+        """
+        self.__start()
+
+    def __start(self):
+        # Returns the running pool, so callers use the pool they started even if another thread restarts it
+        config = Document.get_config()
+        settings = config.settings()
+        snapshot = self.__worker_snapshot()
+        with self.__lock:
+            if self.__pool is not None:
+                if settings == self.__settings:
+                    return self.__pool
+                logger.info("Document settings changed, restarting the worker pool")
+                self.__close()
+            self.__pool = multiprocessing.Pool(self.__processors, warm_worker,
+                                               (config, snapshot, self.__warm, self.__preloaded[0],
+                                                self.__signature_index))
+            self.__settings = settings
+            return self.__pool
+
+    def set_documents(self, documents):
+        """Preload documents in the worker processes, so Lesk scoring sends only their rows
+
+        The worker processes are restarted with the documents on next use, so call it before
+        searching (e.g. once the corpus is built). Disambiguate the documents first to share
+        their synsets with the workers.
+
+        :param documents: documents (None stops preloading)
+        :type documents: semsimilar.semsimilar.model.corpus.Corpus, list<semsimilar.semsimilar.model.document.Document>
+        :returns: void
+
+        :Example:
+
+        >>> pool.set_documents(corpus)
+        """
+        with self.__lock:
+            self.__close()
+            rows = None
+            if documents is not None:
+                rows = dict((id(document), row) for row, document in enumerate(documents))
+            self.__preloaded = (documents, rows)
+
+    def __worker_snapshot(self):
+        # Workers warmed up without a snapshot would each build the signature index, so it is
+        # built once here and saved for them
+        if not (self.__warm and self.__signature_index) or self.__snapshot is not None:
+            return self.__snapshot
+        if self.__temporary_snapshot is None:
+            with self.__snapshot_lock:
+                if self.__temporary_snapshot is None:
+                    handle, path = tempfile.mkstemp(suffix=".index")
+                    os.close(handle)
+                    logger.info("Building the signature index for the worker processes")
+                    index = wsd.SignatureIndex()
+                    index.build()
+                    index.save(path)
+                    self.__temporary_snapshot = path
+        return self.__temporary_snapshot
+
+    def close(self):
+        """Stop the worker processes once they finish their tasks
+
+        :returns: void
+        """
+        with self.__lock:
+            self.__close()
+        with self.__snapshot_lock:
+            if self.__temporary_snapshot is not None:
+                os.remove(self.__temporary_snapshot)
+                self.__temporary_snapshot = None
+
+    def __close(self):
+        if self.__pool is not None:
+            self.__pool.close()
+            self.__pool.join()
+            self.__pool = None
+
+    def imap(self, task, iterable):
+        """Run a task over an iterable in the worker processes
+
+        :param task: function (defined at module level)
+        :param iterable: arguments of the task
+        :type task: function
+        :type iterable: iterable
+        :returns: results in the order of the arguments
+        :rtype: iterator
+        """
+        return self.__start().imap(task, iterable)
+
+    def map_until(self, task, iterable, deadline=None):
+        """Run a task over an iterable in the worker processes until a deadline
+
+        Arguments are submitted one per worker as workers become free, and none is submitted
+        after the deadline. A call cut short by its deadline leaves at most one task per worker
+        running, so later calls do not queue behind abandoned work.
+
+        :param task: function (defined at module level)
+        :param iterable: arguments of the task
+        :param deadline: time (timeit.default_timer) to stop waiting for results at (no limit if None)
+        :type task: function
+        :type iterable: iterable
+        :type deadline: float
+        :returns: results of the leading arguments finished by the deadline, and whether any argument was left out
+        :rtype: (list, bool)
+
+        :Example:
+
+        >>> results, partial = pool.map_until(lesk_task, chunks, timeit.default_timer() + 0.5)
+        """
+        pool = self.__start()
+        arguments = iter(iterable)
+        outstanding = collections.deque(pool.apply_async(task, (argument,))
+                                        for argument in itertools.islice(arguments, self.__processors))
+        results = []
+        while outstanding:
+            try:
+                if deadline is None:
+                    result = outstanding[0].get()
+                else:
+                    result = outstanding[0].get(max(0, deadline - timeit.default_timer()))
+            except multiprocessing.TimeoutError:
+                return results, True
+            outstanding.popleft()
+            results.append(result)
+            if deadline is None or timeit.default_timer() < deadline:
+                for argument in itertools.islice(arguments, 1):
+                    outstanding.append(pool.apply_async(task, (argument,)))
+        left = object()
+        return results, next(arguments, left) is not left
+
+    def disambiguate(self, documents):
+        """Disambiguate documents in the worker processes
+
+        Documents that already have synsets are skipped. The synsets are set on the given
+        documents, so they are reused by later searches.
+
+        :param documents: documents
+        :type documents: list<semsimilar.semsimilar.model.document.Document>
+        :returns: documents disambiguated (those that had no synsets)
+        :rtype: list<semsimilar.semsimilar.model.document.Document>
+        """
+        documents = [document for document in documents if not document.disambiguated]
+        if not documents:
+            return documents
+        for document in documents:
+            if not document.processed:
+                document.generate_tokens()
+        chunks = list(chunk_posts(documents, self.__chunk_size(len(documents), 1)))
+        for chunk, synsets in zip(chunks, self.imap(disambiguate_worker, chunks)):
+            for document, document_synsets in zip(chunk, synsets):
+                document.synsets = document_synsets
+        return documents
+
+    def similarity(self, documents, new_document, count, deadline=None):
+        """Find the documents most similar to a document with Lesk in the worker processes
+
+        Same results as semsimilar.semsimilar.similarity_core.knowledge.lesk.similarity. Only the
+        rows of preloaded documents (see set_documents) and the query are sent to the workers,
+        other documents are sent whole. With a
+        deadline, documents are scored in smaller chunks handed out as workers become free (see
+        map_until), and chunks not scored by the deadline are left out.
+
+        :param documents: documents list
+        :param new_document: document to search
+        :param count: number of results wanted
+        :param deadline: time (timeit.default_timer) to stop waiting for scores at
+        :type documents: list<semsimilar.semsimilar.model.document.Document>
+        :type new_document: semsimilar.semsimilar.model.document.Document
+        :type count: int
+        :type deadline: float
+        :returns: Top matched documents with their scores (0-1)
+        :rtype: semsimilar.semsimilar.similarity_core.results.SearchResults
+        """
+        documents = list(documents)
+        rows = self.__preloaded_rows(documents)
+        if rows is None:
+            self.disambiguate(documents + [new_document])
+            task = functools.partial(lesk_worker, new_document, count)
+            arguments = documents
+        else:
+            self.disambiguate([new_document])
+            task = functools.partial(lesk_rows_worker, new_document, count)
+            arguments = rows
+        if deadline is None:
+            chunk_size = self.__chunk_size(len(documents), 1)
+        else:
+            chunk_size = self.__chunk_size(len(documents), 4)
+        if deadline is None:
+            all_chunk_results = self.imap(task, chunk_posts(arguments, chunk_size))
+            partial = False
+        else:
+            all_chunk_results, partial = self.map_until(task, chunk_posts(arguments, chunk_size), deadline)
+        results = []
+        for start, chunk_results in zip(range(0, len(documents), chunk_size), all_chunk_results):
+            results.extend((documents[start + position], score) for position, score in chunk_results)
+        # Stable sort, so equal scores keep the order of the documents as in lesk.similarity
+        results.sort(key=lambda tup: tup[1], reverse=True)
+        return SearchResults(results[:max(count, 1)], partial)
+
+    def __preloaded_rows(self, documents):
+        # Rows of the documents in the preloaded documents, or None if any of them is not preloaded
+        preloaded, rows = self.__preloaded
+        if rows is None:
+            return None
+        document_rows = []
+        for document in documents:
+            row = rows.get(id(document))
+            if row is None or preloaded[row] is not document:
+                return None
+            document_rows.append(row)
+        return document_rows
+
+    def __chunk_size(self, size, chunks_per_processor):
+        chunks = self.__processors * chunks_per_processor
+        return max(1, (size + chunks - 1) // chunks)
+
+
+def __process_posts(posts, pool, processors, cache, chunk_size, task, receive, progress):
+    """Run a worker task over the posts not found in the cache
+
+    Returns (document, value) for every post in input order, where value is what receive gives
+    for the document, or None for cached documents. A temporary pool is used if none is given.
+    Cached documents take the id of their post, and posts with the same content get copies.
+    """
+    if pool is None:
+        with WorkerPool(processors, warm=False) as pool:
+            return __process_posts(posts, pool, processors, cache, chunk_size, task, receive, progress)
+
+    all_posts = posts
+    cached_documents = {}
+    if cache is not None:
+        keys = [cache.key(post[TITLE_KEY], post[DESCRIPTION_KEY], post[TAGS_KEY], spec) for post in posts]
+        cached_documents = cache.get_many(keys)
+        posts = [post for post, key in zip(posts, keys) if key not in cached_documents]
+        logger.info("%s documents found in the cache", len(cached_documents))
+        if progress is not None:
+            progress.cached(len(cached_documents))
+
+    logger.debug("Number of processors %s", pool.processors)
+    logger.info("Corpus size is %s, chunk size is %s", len(posts), chunk_size)
+
+    # The pool's task queue gives the next chunk to the first free worker; imap returns the
+    # results in input order
+    processed = []
+    if posts:
+        chunk_size = max(1, chunk_size)
+        if progress is not None:
+            progress.queued((len(posts) + chunk_size - 1) // chunk_size)
+            task = functools.partial(measured_task, task)
+        for result in pool.imap(task, chunk_posts(posts, chunk_size)):
+            if progress is not None:
+                result, stats = result
+                progress.completed(stats)
+            documents, values = receive(result)
+            processed.extend(zip(documents, values))
+
+    if cache is None:
+        return processed
+
+    # Merge cached and new documents back into the order of the posts
+    cache.put_many([(key, document) for key, (document, value) in
+                    zip([key for key in keys if key not in cached_documents], processed)])
+    results = []
+    processed = iter(processed)
+    used = set()
+    for post, key in zip(all_posts, keys):
+        document = cached_documents.get(key)
+        if document is None:
+            results.append(next(processed))
+            continue
+        # Entries are addressed by content, so posts with the same content share one
+        if key in used:
+            document = copy.copy(document)
+        used.add(key)
+        document.id = post[ID_KEY]
+        results.append((document, None))
+    return results
+
+
+def parallel_process(posts, processors=None, cache=None, chunk_size=CHUNK_SIZE, progress=None, pool=None):
     """Process large set of documents using parallel processing
 
+    Posts are handed out in small chunks to whichever worker is free, so a run of long posts does
+    not leave the other workers idle.
+
     :param posts: posts, articles
-    :param processors: number of processors
+    :param processors: number of processors (defaults to all of them)
+    :param cache: processed documents from earlier runs, only new or edited posts are processed
+    :param chunk_size: number of posts handed to a worker at a time
+    :param progress: collects throughput, stage timings, queue depth and ETA (finished on return)
+    :param pool: warm worker pool to be used (processors is ignored), a temporary pool by default
     :type posts: list<key-value object>
     :type processors: int
-    :returns: Processed documents
-    :rtype: list<semsimilar.semsimilar.model.document.Document>
+    :type cache: semsimilar.semsimilar.model.document_cache.DocumentCache
+    :type chunk_size: int
+    :type progress: semsimilar.semsimilar.model.ingest_progress.IngestProgress
+    :type pool: semsimilar.semsimilar.model.document_worker.WorkerPool
+    :returns: Processed documents and their stemmed texts, in the order of the posts
+    :rtype: (list<semsimilar.semsimilar.model.document.Document>, list<string>)
 
+    .. note:: Pass the result to semsimilar.semsimilar.model.corpus.Corpus to map HAL rows to documents.
     .. note:: Keys can be initialized before calling this function. (ID_KEY, TITLE_KEY, DESCRIPTION_KEY, TAGS_KEY)
 
     :Example:
@@ -70,32 +590,128 @@ def parallel_process(posts, processors):
             articles = json.loads(articles_file.read())
     >>> parallel_process(articles, 2)
     """
-    logger = logging.getLogger(__name__)
     logger.info("Parallel processing of documents started")
-    if 1 > processors or multiprocessing.cpu_count() < processors:
-        raise InvalidProcessorCount("Processor count " + str(processors) + " is invalid")
+    results = __process_posts(posts, pool, processors, cache, chunk_size, worker, lambda result: result, progress)
+    documents = []
+    texts = []
+    for document, text in results:
+        documents.append(document)
+        texts.append(text if text is not None else " ".join(document.stemmed_tokens))
+    if progress is not None:
+        progress.finish()
+    return documents, texts
+
+
+def parallel_process_token_ids(posts, processors=None, cache=None, chunk_size=CHUNK_SIZE, vocabulary=None,
+                               progress=None, pool=None, disambiguate=False):
+    """Process large set of documents, returning stemmed token ids for HAL instead of texts
+
+    The ids are built from the stemmed tokens of the returned documents, so the stemmed texts are
+    neither sent back as strings nor tokenized again by the HAL vectorizer.
+
+    :param posts: posts, articles
+    :param processors: number of processors (defaults to all of them)
+    :param cache: processed documents from earlier runs, only new or edited posts are processed
+    :param chunk_size: number of posts handed to a worker at a time
+    :param vocabulary: vocabulary the token ids refer to (a new one by default)
+    :param progress: collects throughput, stage timings, queue depth and ETA (finished on return)
+    :param pool: warm worker pool to be used (processors is ignored), a temporary pool by default
+    :param disambiguate: disambiguate new documents in the workers, so they are cached and measured with their synsets
+    :type posts: list<key-value object>
+    :type processors: int
+    :type cache: semsimilar.semsimilar.model.document_cache.DocumentCache
+    :type chunk_size: int
+    :type vocabulary: semsimilar.semsimilar.model.vocabulary.Vocabulary
+    :type progress: semsimilar.semsimilar.model.ingest_progress.IngestProgress
+    :type pool: semsimilar.semsimilar.model.document_worker.WorkerPool
+    :type disambiguate: bool
+    :returns: Processed documents in the order of the posts, and their stemmed token ids
+    :rtype: (list<semsimilar.semsimilar.model.document.Document>, semsimilar.semsimilar.model.vocabulary.TokenIds)
+
+    :Example:
+
+    >>> documents, token_ids = parallel_process_token_ids(articles)
+    >>> hal = HAL(token_ids=token_ids)
+    """
+    logger.info("Parallel processing of documents started")
+    if vocabulary is None:
+        vocabulary = Vocabulary()
+    documents = []
+    ids = []
+    __process_token_ids(posts, pool, processors, cache, chunk_size, vocabulary, progress, documents, ids,
+                        disambiguate)
+    if progress is not None:
+        progress.finish()
+    return documents, __join_token_ids(vocabulary, ids)
+
+
+def parallel_process_stream(posts, batch_size, processors=None, cache=None, chunk_size=CHUNK_SIZE, progress=None,
+                            pool=None, disambiguate=False):
+    """Process a stream of posts in bounded batches
+
+    Only one batch of raw posts is held at a time, so memory used for ingestion does not depend on
+    the size of the dump.
+
+    :param posts: posts, articles (e.g. from semsimilar.semsimilar.model.post_loader.iter_posts)
+    :param batch_size: number of posts read and processed at a time
+    :param processors: number of processors (defaults to all of them)
+    :param cache: processed documents from earlier runs, only new or edited posts are processed
+    :param chunk_size: number of posts handed to a worker at a time
+    :param progress: collects throughput, stage timings, queue depth and ETA (finished on return)
+    :param pool: warm worker pool to be used (processors is ignored), a temporary pool by default
+    :param disambiguate: disambiguate new documents in the workers, so they are cached and measured with their synsets
+    :type posts: iterable<key-value object>
+    :type batch_size: int
+    :type processors: int
+    :type cache: semsimilar.semsimilar.model.document_cache.DocumentCache
+    :type chunk_size: int
+    :type progress: semsimilar.semsimilar.model.ingest_progress.IngestProgress
+    :type pool: semsimilar.semsimilar.model.document_worker.WorkerPool
+    :type disambiguate: bool
+    :returns: Processed documents in the order of the posts, and their stemmed token ids
+    :rtype: (list<semsimilar.semsimilar.model.document.Document>, semsimilar.semsimilar.model.vocabulary.TokenIds)
+
+    :Example:
+
+    >>> documents, token_ids = parallel_process_stream(iter_posts('Posts.xml'), 10000)
+    >>> hal = HAL(token_ids=token_ids)
+    """
+    if pool is None:
+        # One temporary pool for all the batches
+        with WorkerPool(processors, warm=False) as pool:
+            return parallel_process_stream(posts, batch_size, cache=cache, chunk_size=chunk_size,
+                                           progress=progress, pool=pool, disambiguate=disambiguate)
+
+    vocabulary = Vocabulary()
+    documents = []
+    ids = []
+    for batch in batch_posts(posts, batch_size):
+        __process_token_ids(batch, pool, None, cache, chunk_size, vocabulary, progress, documents, ids,
+                            disambiguate)
+        logger.info("%s documents processed", len(documents))
+    if progress is not None:
+        progress.finish()
+    return documents, __join_token_ids(vocabulary, ids)
+
+
+def __process_token_ids(posts, pool, processors, cache, chunk_size, vocabulary, progress, documents, ids,
+                        disambiguate):
+    """Process posts with create_documents (or disambiguated_documents), appending the documents and their token ids"""
+    task = disambiguated_documents if disambiguate else create_documents
+    # Documents already carry their stemmed tokens, so processed and cached ones are encoded alike
+    results = __process_posts(posts, pool, processors, cache, chunk_size, task,
+                              lambda result: (result, [None] * len(result)), progress)
+    for document, _ in results:
+        documents.append(document)
+        ids.append(np.array(vocabulary.encode(document.stemmed_tokens), dtype=np.int32))
+
+
+def __join_token_ids(vocabulary, ids):
+    """Join the token id arrays of documents into TokenIds"""
+    offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(document_ids) for document_ids in ids])
+    if ids:
+        ids = np.concatenate(ids)
     else:
-        corpus_size = len(posts)
-        jobs = []
-
-        manager = multiprocessing.Manager()
-        final_documents = manager.list()
-        final_texts = manager.list()
-        logger.debug("Number of processors %s", processors)
-        logger.info("Splitting of corpus started. Corpus size is %s", len(posts))
-        for i in range(processors):
-            if i == processors - 1:
-                temp_posts = posts[(corpus_size / processors) * i:(i + 1) * (
-                corpus_size / processors) + corpus_size % processors]
-            else:
-                temp_posts = posts[(corpus_size / processors) * i:(i + 1) * (corpus_size / processors)]
-            logger.debug("Length of the sub-corpus %s", len(temp_posts))
-            p = multiprocessing.Process(target=worker, args=(temp_posts, final_documents, final_texts))
-            jobs.append(p)
-            p.start()
-
-        for job in jobs:
-            job.join()
-
-        result = (final_documents, final_texts)
-        return result
+        ids = np.zeros(0, dtype=np.int32)
+    return TokenIds(vocabulary.words, ids, offsets)
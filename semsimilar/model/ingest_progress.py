@@ -0,0 +1,191 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+import json
+import logging
+import threading
+import timeit
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class IngestProgress(object):
+    """Throughput, per-stage timings, queue depth and ETA of an ingestion run
+
+    Pass it to parallel_process, parallel_process_token_ids or parallel_process_stream. Workers
+    measure every chunk they process and the parent adds the measurements up as the chunks come
+    back, calling the callback with a snapshot on the way.
+
+    :param total: number of posts expected (used for the ETA), unknown if None
+    :param callback: called with a snapshot (see snapshot) as chunks are completed
+    :param interval: minimum seconds between two callbacks
+    :param path: JSON file the summary is written to when the run finishes
+    :type total: int
+    :type callback: function
+    :type interval: float
+    :type path: string
+    :returns: ingestion progress
+    :rtype: semsimilar.semsimilar.model.ingest_progress.IngestProgress
+
+    :Example:
+
+    >>> progress = IngestProgress(total=len(posts), callback=log_progress, path="ingest.json")
+    >>> documents, texts = parallel_process(posts, progress=progress)
+    >>> progress.summary()["docs_per_second"]
+    1250.3
+    """
+
+    def __init__(self, total=None, callback=None, interval=1.0, path=None):
+        self.total = total
+        self.callback = callback
+        self.interval = interval
+        self.path = path
+        self.__lock = threading.Lock()
+        self.__start = None
+        self.__end = None
+        self.__last_report = None
+        self.__queued_chunks = 0
+        self.__completed_chunks = 0
+        self.__processed = 0
+        self.__cached = 0
+        self.__stages = defaultdict(lambda: {"seconds": 0.0, "calls": 0})
+        self.__workers = defaultdict(lambda: {"documents": 0, "chunks": 0, "seconds": 0.0})
+
+    def start(self):
+        """Start the clock (the first call only)
+
+        :returns: void
+        """
+        with self.__lock:
+            if self.__start is None:
+                self.__start = timeit.default_timer()
+
+    def queued(self, chunks):
+        """Record chunks handed to the workers
+
+        :param chunks: number of chunks
+        :type chunks: int
+        :returns: void
+        """
+        self.start()
+        with self.__lock:
+            self.__queued_chunks += chunks
+
+    def cached(self, documents):
+        """Record documents taken from the document cache instead of being processed
+
+        :param documents: number of documents
+        :type documents: int
+        :returns: void
+        """
+        self.start()
+        with self.__lock:
+            self.__cached += documents
+
+    def completed(self, stats):
+        """Record a chunk processed by a worker
+
+        :param stats: worker, number of documents, seconds and stage timings of the chunk
+        :type stats: dict
+        :returns: void
+        """
+        with self.__lock:
+            self.__completed_chunks += 1
+            self.__processed += stats["documents"]
+            worker = self.__workers[stats["worker"]]
+            worker["documents"] += stats["documents"]
+            worker["chunks"] += 1
+            worker["seconds"] += stats["seconds"]
+            for name, stage in stats["stages"].items():
+                self.__stages[name]["seconds"] += stage["seconds"]
+                self.__stages[name]["calls"] += stage["calls"]
+            now = timeit.default_timer()
+            report = self.callback is not None and (self.__last_report is None or
+                                                    now - self.__last_report >= self.interval)
+            if report:
+                self.__last_report = now
+        if report:
+            self.callback(self.snapshot())
+
+    def snapshot(self):
+        """Get the progress so far
+
+        :returns: elapsed seconds, documents processed and cached, docs/sec, queue depth (chunks
+                  waiting or being processed), ETA in seconds (None if unknown), per-stage and
+                  per-worker totals
+        :rtype: dict
+        """
+        with self.__lock:
+            end = self.__end if self.__end is not None else timeit.default_timer()
+            elapsed = end - self.__start if self.__start is not None else 0.0
+            done = self.__processed + self.__cached
+            docs_per_second = self.__processed / elapsed if elapsed > 0 else 0.0
+            eta = None
+            if self.__end is not None:
+                eta = 0.0
+            elif docs_per_second > 0 and self.total is not None:
+                eta = max(0, self.total - done) / docs_per_second
+            workers = {}
+            for name, worker in self.__workers.items():
+                workers[name] = dict(worker, docs_per_second=worker["documents"] / worker["seconds"]
+                                     if worker["seconds"] > 0 else 0.0)
+            return {
+                "elapsed": elapsed,
+                "total": self.total,
+                "documents": done,
+                "processed": self.__processed,
+                "cached": self.__cached,
+                "docs_per_second": docs_per_second,
+                "queue_depth": self.__queued_chunks - self.__completed_chunks,
+                "eta": eta,
+                "stages": dict((name, dict(stage)) for name, stage in self.__stages.items()),
+                "workers": workers
+            }
+
+    def finish(self):
+        """Stop the clock and write the summary to path (if given)
+
+        :returns: summary (a final snapshot)
+        :rtype: dict
+        """
+        with self.__lock:
+            if self.__end is None:
+                self.__end = timeit.default_timer()
+        summary = self.snapshot()
+        if self.path is not None:
+            with open(self.path, "w") as summary_file:
+                json.dump(summary, summary_file, indent=2, sort_keys=True)
+        if self.callback is not None:
+            self.callback(summary)
+        return summary
+
+    def summary(self):
+        """Get the summary of a finished run (same as snapshot)
+
+        :returns: summary
+        :rtype: dict
+        """
+        return self.snapshot()
+
+
+def log_progress(snapshot):
+    """Callback of IngestProgress that logs the progress
+
+    :param snapshot: snapshot of the progress
+    :type snapshot: dict
+    :returns: void
+    """
+    if snapshot["eta"] is None:
+        eta = "unknown"
+    else:
+        eta = "%.0fs" % snapshot["eta"]
+    logger.info("%s documents (%s cached), %.1f docs/sec, %s chunks queued, ETA %s",
+                snapshot["documents"], snapshot["cached"], snapshot["docs_per_second"],
+                snapshot["queue_depth"], eta)
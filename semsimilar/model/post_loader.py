@@ -0,0 +1,195 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+import io
+import json
+import re
+from semsimilar.model import document_worker
+
+try:
+    from xml.etree import cElementTree as ElementTree
+except ImportError:
+    from xml.etree import ElementTree
+
+# Stack Exchange PostTypeId of questions (answers have no title)
+QUESTION_POST_TYPE = "1"
+
+# Characters that can end a number or a literal (true, false, null)
+DELIMITERS = " \t\r\n,:[]{}\""
+
+
+def iter_json_array(json_file, buffer_size=65536):
+    """Read the objects of a JSON array one at a time
+
+    Only the object being decoded and one buffer of text are held in memory.
+
+    :param json_file: text file containing a JSON array
+    :param buffer_size: number of characters read at a time
+    :type json_file: file
+    :type buffer_size: int
+    :returns: objects of the array
+    :rtype: generator<dict>
+
+    :Example:
+
+    >>> with io.open('posts.json', encoding='utf-8') as posts_file:
+            for post in iter_json_array(posts_file):
+                print(post['Title'])
+    """
+    decoder = json.JSONDecoder()
+    buffer = json_file.read(buffer_size)
+    position = __skip(buffer, 0, " \t\r\n")
+    if position == len(buffer):
+        return
+    if buffer[position] != "[":
+        raise ValueError("Expected a JSON array")
+    position += 1
+    end_of_file = False
+    while True:
+        position = __skip(buffer, position, " \t\r\n,")
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        if end_of_file or __delimited(buffer, position):
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except ValueError as error:
+                # Reading more data only helps when the element was cut by the end of the buffer
+                if not __truncated(buffer, error):
+                    raise
+                if end_of_file:
+                    raise ValueError("Unexpected end of JSON array")
+            else:
+                yield value
+                position = end
+                continue
+        data = json_file.read(buffer_size)
+        end_of_file = not data
+        buffer = buffer[position:] + data
+        position = 0
+
+
+def __skip(buffer, position, characters):
+    while position < len(buffer) and buffer[position] in characters:
+        position += 1
+    return position
+
+
+def __token_end(buffer, position):
+    while position < len(buffer) and buffer[position] not in DELIMITERS:
+        position += 1
+    return position
+
+
+def __delimited(buffer, position):
+    # Numbers and literals have no closing character, so one cut by the end of the buffer would be
+    # decoded as a shorter value
+    if position == len(buffer):
+        return False
+    return buffer[position] in "{[\"" or __token_end(buffer, position) < len(buffer)
+
+
+def __truncated(buffer, error):
+    if str(error).startswith("Unterminated string"):
+        return True
+    position = getattr(error, "pos", None)
+    if position is None:
+        # Python 2 only gives the position in the message
+        match = re.search(r"\(char (\d+)", str(error))
+        if match is None:
+            return False
+        position = int(match.group(1))
+    return __token_end(buffer, position) == len(buffer)
+
+
+def iter_json_lines(json_file):
+    """Read one JSON object per line (JSON Lines)
+
+    :param json_file: text file with a JSON object on each line
+    :type json_file: file
+    :returns: objects
+    :rtype: generator<dict>
+    """
+    for line in json_file:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_posts_xml(xml_file, questions_only=True):
+    """Read posts from a Stack Exchange Posts.xml dump
+
+    Rows are released as soon as they are read, so memory does not grow with the dump.
+
+    :param xml_file: Posts.xml file
+    :param questions_only: skip answers and other posts without a title
+    :type xml_file: file
+    :type questions_only: bool
+    :returns: posts with ID_KEY, TITLE_KEY, DESCRIPTION_KEY and TAGS_KEY of document_worker
+    :rtype: generator<dict>
+    """
+    context = ElementTree.iterparse(xml_file, events=("start", "end"))
+    event, root = next(context)
+    for event, element in context:
+        if event != "end" or element.tag != "row":
+            continue
+        attributes = element.attrib
+        if not questions_only or attributes.get("PostTypeId") == QUESTION_POST_TYPE:
+            yield {
+                document_worker.ID_KEY: int(attributes["Id"]),
+                document_worker.TITLE_KEY: attributes.get("Title", ""),
+                document_worker.DESCRIPTION_KEY: attributes.get("Body", ""),
+                document_worker.TAGS_KEY: attributes.get("Tags", "")
+            }
+        root.clear()
+
+
+def count_posts(path):
+    """Count the posts of a dump (e.g. as the total of an IngestProgress)
+
+    The posts are only parsed, which takes little time next to processing them.
+
+    :param path: dump file (see iter_posts)
+    :type path: string
+    :returns: number of posts
+    :rtype: int
+
+    :Example:
+
+    >>> progress = IngestProgress(total=count_posts('Posts.xml'))
+    """
+    return sum(1 for post in iter_posts(path))
+
+
+def iter_posts(path):
+    """Read posts from a dump, choosing the format by file extension
+
+    .. note:: Supported formats are JSON arrays (.json), JSON Lines (.jsonl, .ndjson) and Stack Exchange Posts.xml (.xml)
+
+    :param path: dump file
+    :type path: string
+    :returns: posts
+    :rtype: generator<dict>
+
+    :Example:
+
+    >>> documents, token_ids = parallel_process_stream(iter_posts('Posts.xml'), 10000)
+    """
+    lower_path = path.lower()
+    if lower_path.endswith(".xml"):
+        with open(path, "rb") as xml_file:
+            for post in iter_posts_xml(xml_file):
+                yield post
+    elif lower_path.endswith(".jsonl") or lower_path.endswith(".ndjson"):
+        with io.open(path, encoding="utf-8") as json_file:
+            for post in iter_json_lines(json_file):
+                yield post
+    else:
+        with io.open(path, encoding="utf-8") as json_file:
+            for post in iter_json_array(json_file):
+                yield post
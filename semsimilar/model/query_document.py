@@ -0,0 +1,127 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+from semsimilar import instrumentation
+from semsimilar.textprocessor.wsd import get_synsets
+from semsimilar.model.document import Document
+
+
+class QueryDocument(object):
+    """Search query processed only for what HAL and Lesk use
+
+    Unlike Document, the text is not built from title, description and tags, and the
+    configuration is captured when the query is created, so changing the Document settings does
+    not affect a query being searched. Tokens are kept as tuples instead of being interned in the
+    shared vocabularies, so arbitrary queries do not grow them. Stems and synsets go through the
+    stem and synset caches. Queries hold no shared mutable state and can be created from many
+    threads at once.
+
+    :param text: query text
+    :param pipeline: text pipeline (defaults to the one of config)
+    :param window: size of the window used for word sense disambiguation (defaults to the one of config)
+    :param config: configuration used to process the query (defaults to the one of Document)
+    :type text: string
+    :type pipeline: semsimilar.semsimilar.textprocessor.pipeline.TextPipeline
+    :type window: int
+    :type config: semsimilar.semsimilar.model.document_config.DocumentConfig
+    :returns: query document
+    :rtype: semsimilar.semsimilar.model.query_document.QueryDocument
+
+    **Property**:
+     - text
+     - tokens
+     - stemmed_tokens
+     - synset_tokens
+     - synsets
+     - config
+     - processed
+     - disambiguated
+
+    **Setter**
+     - synsets
+
+    :Example:
+
+    >>> query = QueryDocument("php session security")
+    >>> ss_similarity(corpus, query, hal, 10)
+    """
+    __slots__ = ('__text', '__config', '__tokens', '__stemmed_tokens', '__synset_tokens', '__synsets')
+
+    def __init__(self, text, pipeline=None, window=None, config=None):
+        if config is None:
+            config = Document.get_config()
+        if pipeline is not None:
+            config = config.replace(tokenizer=pipeline.tokenizer, pipeline=pipeline)
+        if window is not None:
+            config = config.replace(window=window)
+        self.__text = text
+        self.__config = config
+        with instrumentation.timer("query.process"):
+            tokens, stemmed_tokens, synset_tokens = config.pipeline.process(text or "")
+        self.__tokens = tuple(tokens)
+        self.__stemmed_tokens = tuple(stemmed_tokens)
+        self.__synset_tokens = tuple(synset_tokens)
+        self.__synsets = None
+
+    @property
+    def text(self):
+        return self.__text
+
+    @property
+    def tokens(self):
+        return list(self.__tokens)
+
+    @property
+    def stemmed_tokens(self):
+        return list(self.__stemmed_tokens)
+
+    @property
+    def synset_tokens(self):
+        return list(self.__synset_tokens)
+
+    @property
+    def synsets(self):
+        synsets = self.__synsets
+        if synsets is None:
+            with instrumentation.timer("query.wsd"):
+                synsets = self.__synsets = tuple(get_synsets(self.__synset_tokens, self.__config.window))
+        return list(synsets)
+
+    @synsets.setter
+    def synsets(self, synsets):
+        self.__synsets = tuple(synsets)
+
+    @property
+    def config(self):
+        return self.__config
+
+    @property
+    def processed(self):
+        """Whether the tokens have been generated (always, on creation)"""
+        return True
+
+    @property
+    def disambiguated(self):
+        """Whether the synsets have been generated"""
+        return self.__synsets is not None
+
+    def generate_tokens(self):
+        """Tokens are generated on creation, kept for compatibility with Document
+
+        :returns: void
+        """
+        pass
+
+    def __getstate__(self):
+        return (self.__text, self.__config, self.__tokens, self.__stemmed_tokens, self.__synset_tokens,
+                self.__synsets)
+
+    def __setstate__(self, state):
+        (self.__text, self.__config, self.__tokens, self.__stemmed_tokens, self.__synset_tokens,
+         self.__synsets) = state
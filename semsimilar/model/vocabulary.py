@@ -0,0 +1,187 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+import threading
+from array import array
+
+# Id stored for a missing value (a token without a synset)
+NONE_ID = -1
+
+
+class Vocabulary(object):
+    """Interned words mapped to integer ids
+
+    Documents keep arrays of ids instead of lists of strings, so every distinct word is held
+    once however many documents contain it. Ids are only valid within the process that assigned
+    them.
+
+    :returns: vocabulary
+    :rtype: semsimilar.semsimilar.model.vocabulary.Vocabulary
+
+    :Example:
+
+    >>> vocabulary = Vocabulary()
+    >>> ids = vocabulary.encode(['php', 'session', 'php'])
+    array('i', [0, 1, 0])
+    >>> vocabulary.decode(ids)
+    ['php', 'session', 'php']
+    """
+
+    def __init__(self):
+        self.__ids = {}
+        self.__words = []
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__words)
+
+    @property
+    def words(self):
+        return self.__words
+
+    def __contains__(self, word):
+        return word in self.__ids
+
+    def get_id(self, word):
+        """Get the id of a word, adding it to the vocabulary if it is new
+
+        :param word: word (None is stored as NONE_ID)
+        :type word: string
+        :returns: id of the word
+        :rtype: int
+        """
+        if word is None:
+            return NONE_ID
+        id = self.__ids.get(word)
+        if id is None:
+            with self.__lock:
+                id = self.__ids.get(word)
+                if id is None:
+                    id = len(self.__words)
+                    self.__words.append(word)
+                    self.__ids[word] = id
+        return id
+
+    def get_word(self, id):
+        """Get the word of an id
+
+        :param id: id of the word
+        :type id: int
+        :returns: word or None
+        :rtype: string
+        """
+        if id == NONE_ID:
+            return None
+        return self.__words[id]
+
+    def encode(self, words):
+        """Convert words to an array of ids
+
+        :param words: list of words
+        :type words: list<string>
+        :returns: ids
+        :rtype: array.array
+        """
+        return array('i', [self.get_id(word) for word in words])
+
+    def decode(self, ids):
+        """Convert ids back to words
+
+        :param ids: ids
+        :type ids: array.array
+        :returns: list of words
+        :rtype: list<string>
+        """
+        words = self.__words
+        return [words[id] if id != NONE_ID else None for id in ids]
+
+
+# Words a vocabulary takes before documents processed later are given new vocabularies
+MAX_WORDS = 1000000
+
+# Vocabularies (tokens, synsets) given to the documents processed from now on
+_vocabularies = (Vocabulary(), Vocabulary())
+_lock = threading.Lock()
+
+
+def get_vocabularies():
+    """Get the vocabularies for a document being processed
+
+    Documents keep the vocabularies they were encoded with, so once the token vocabulary holds
+    MAX_WORDS words, new ones are started and the old ones are freed with the last document using
+    them. Vocabularies therefore do not grow for the life of the process (e.g. with the words of
+    every query).
+
+    :returns: token vocabulary and synset vocabulary
+    :rtype: (semsimilar.semsimilar.model.vocabulary.Vocabulary, semsimilar.semsimilar.model.vocabulary.Vocabulary)
+    """
+    vocabularies = _vocabularies
+    if len(vocabularies[0]) >= MAX_WORDS:
+        with _lock:
+            if _vocabularies is vocabularies:
+                reset_vocabularies()
+            vocabularies = _vocabularies
+    return vocabularies
+
+
+def reset_vocabularies():
+    """Start new vocabularies for the documents processed from now on
+
+    Documents already processed keep their vocabularies, so they are not affected.
+
+    :returns: void
+
+    :Example:
+
+    >>> corpus = Corpus(documents)
+    >>> reset_vocabularies()  # the words of queries are not added to the vocabularies of the corpus
+    """
+    global _vocabularies
+    _vocabularies = (Vocabulary(), Vocabulary())
+
+
+class TokenIds(object):
+    """Token ids of many documents in one flat array
+
+    The ids of document i are ids[offsets[i]:offsets[i + 1]] and refer to words.
+
+    :param words: word of each id
+    :param ids: token ids of all the documents
+    :param offsets: start of each document in ids, followed by len(ids)
+    :type words: list<string>
+    :type ids: numpy.ndarray
+    :type offsets: numpy.ndarray
+    :returns: token ids
+    :rtype: semsimilar.semsimilar.model.vocabulary.TokenIds
+
+    :Example:
+
+    >>> token_ids = TokenIds(['php', 'session'], numpy.array([0, 1, 0]), numpy.array([0, 2, 3]))
+    >>> token_ids.get_words(1)
+    ['php']
+    """
+
+    def __init__(self, words, ids, offsets):
+        self.words = words
+        self.ids = ids
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def get_words(self, index):
+        """Get the words of a document
+
+        :param index: position of the document
+        :type index: int
+        :returns: list of words
+        :rtype: list<string>
+        """
+        words = self.words
+        return [words[id] for id in self.ids[self.offsets[index]:self.offsets[index + 1]]]
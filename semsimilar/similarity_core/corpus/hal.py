@@ -10,18 +10,31 @@ __email__ = "uslperera@gmail.com"
 
 import logging
 import numpy.linalg as LA
-from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, CountVectorizer, TfidfTransformer
+from scipy import sparse
 import numpy as np
 import collections
+import itertools
+from semsimilar import instrumentation
+
+logger = logging.getLogger(__name__)
 
 
 class HAL(object):
     """Hyperspace Analogue to Language
 
-    Can be used to find similar documents using keywords and word co-occurrences.
+    Can be used to find similar documents using keywords and word co-occurrences. Thresholds
+    belong to the model, and searches only read it, so one model can be searched from many
+    threads at once.
 
     :param documents: documents list
+    :param token_ids: stemmed token ids of the documents, used instead of documents
+    :param threshold: minimum keyword similarity (0-1) of a result
+    :param semantic_threshold: minimum co-occurrence (0-1) of a related term
     :type documents: list<semsimilar.semsimilar.model.document.Document>
+    :type token_ids: semsimilar.semsimilar.model.vocabulary.TokenIds
+    :type threshold: float
+    :type semantic_threshold: float
     :returns: HAL model
     :rtype: semsimilar.semsimilar.similar.corpus.hal.HAL
 
@@ -29,7 +42,9 @@ class HAL(object):
      - co_occurrence_matrix
      - document_term_matrix
      - threshold
+     - semantic_threshold
      - vocabulary
+     - version (changes whenever the model is changed)
 
     **Setter**
      - threshold
@@ -43,19 +58,22 @@ class HAL(object):
     __tfidf = None
     __dtm = None
     __cm = None
-    __threshold = 0.1
-    __semantic_threshold = 0.4
     __vocabulary = None
-
-    __logger = None
-
-    def __init__(self, documents):
-        self.__logger = logging.getLogger(__name__)
-        self.__logger.info("HAL model creation started")
+    __feature_names = None
+    __version = 0
+    __versions = itertools.count(1)
+
+    def __init__(self, documents=None, token_ids=None, threshold=0.1, semantic_threshold=0.4):
+        logger.info("HAL model creation started")
+        self.__threshold = threshold
+        self.__semantic_threshold = semantic_threshold
         self.__tfidf = TfidfVectorizer(input="content")
-        self.create_document_term_matrix(documents)
+        if token_ids is not None:
+            self.create_document_term_matrix_from_ids(token_ids)
+        else:
+            self.create_document_term_matrix(documents)
         self.create_co_occurrence_matrix(documents)
-        self.__logger.info("HAL model creation finished")
+        logger.info("HAL model creation finished")
 
     @property
     def co_occurrence_matrix(self):
@@ -73,16 +91,29 @@ class HAL(object):
     def threshold(self, threshold):
         if 0 <= threshold < 1:
             self.__threshold = threshold
+            self.__changed()
+
+    @property
+    def semantic_threshold(self):
+        return self.__semantic_threshold
 
     @property
     def vocabulary(self):
         return self.__vocabulary
 
+    @property
+    def version(self):
+        return self.__version
+
+    def __changed(self):
+        # Versions are unique across models, so results cached for one model never match another
+        self.__version = next(HAL.__versions)
+
     @staticmethod
     def cosine(a, b):
         # Find the cosine distance between two vectors
         try:
-            result = round(np.inner(a, b) / (LA.norm(a) * LA.norm(b)), 3)
+            result = round(np.asarray(np.inner(a, b) / (LA.norm(a) * LA.norm(b))).item(), 3)
         except ZeroDivisionError:
             result = 0
         return result
@@ -99,9 +130,51 @@ class HAL(object):
         >>> documents = ["first document", "second document"]
         >>> hal.create_document_term_matrix(documents)
         """
-        logging.info("Started creating TFidf matrix")
+        logger.info("Started creating TFidf matrix")
         self.__dtm = self.__tfidf.fit_transform(documents).toarray()
-        self.__vocabulary = np.array(self.__tfidf.get_feature_names())
+        if hasattr(self.__tfidf, "get_feature_names_out"):
+            self.__feature_names = list(self.__tfidf.get_feature_names_out())
+        else:
+            # scikit-learn < 1.0
+            self.__feature_names = self.__tfidf.get_feature_names()
+        self.__vocabulary = np.array(self.__feature_names)
+        self.__changed()
+
+    def create_document_term_matrix_from_ids(self, token_ids):
+        """Create document term matrix from token ids without joining and re-tokenizing texts
+
+        Each distinct word is passed through the vectorizer's analyzer once, so the matrix is the
+        same as the one create_document_term_matrix builds from the joined stemmed texts.
+
+        :param token_ids: stemmed token ids of the documents
+        :type token_ids: semsimilar.semsimilar.model.vocabulary.TokenIds
+        :returns: void
+
+        :Example:
+
+        >>> documents, token_ids = parallel_process_token_ids(posts)
+        >>> hal.create_document_term_matrix_from_ids(token_ids)
+        """
+        logger.info("Started creating TFidf matrix from token ids")
+        analyzer = self.__tfidf.build_analyzer()
+        word_terms = [analyzer(word) for word in token_ids.words]
+        feature_names = sorted(set(term for terms in word_terms for term in terms))
+        term_index = dict((term, index) for index, term in enumerate(feature_names))
+        rows = []
+        columns = []
+        for word_id, terms in enumerate(word_terms):
+            for term in terms:
+                rows.append(word_id)
+                columns.append(term_index[term])
+        word_term = sparse.csr_matrix((np.ones(len(rows)), (rows, columns)),
+                                      shape=(len(word_terms), len(feature_names)))
+        document_word = sparse.csr_matrix((np.ones(len(token_ids.ids)), token_ids.ids, token_ids.offsets),
+                                          shape=(len(token_ids), len(word_terms)))
+        counts = document_word.dot(word_term)
+        self.__dtm = TfidfTransformer().fit_transform(counts).toarray()
+        self.__feature_names = feature_names
+        self.__vocabulary = np.array(feature_names)
+        self.__changed()
 
     def create_co_occurrence_matrix(self, documents):
         """Create term co-occurrence matrix.
@@ -115,7 +188,7 @@ class HAL(object):
         >>> documents = ["first document", "second document"]
         >>> hal.create_co_occurrence_matrix(documents)
         """
-        logging.info("Started creating co-occurrence matrix")
+        logger.info("Started creating co-occurrence matrix")
         x = self.document_term_matrix
         cooccurrence_matrix = np.dot(x.transpose(), x)
         cooccurrence_matrix_diagonal = np.diagonal(cooccurrence_matrix)
@@ -123,7 +196,8 @@ class HAL(object):
             cooccurrence_matrix_percentage = np.true_divide(cooccurrence_matrix,
                                                             cooccurrence_matrix_diagonal[:, None])
         self.__cm = cooccurrence_matrix_percentage
-        logging.info("Finished creating co-occurrence matrix")
+        self.__changed()
+        logger.info("Finished creating co-occurrence matrix")
 
     def convert_to_vector_space(self, query):
         """Convert text into vector space.
@@ -143,10 +217,8 @@ class HAL(object):
         [[0 1 0 1 1]]
         _
         """
-        logging.info("Started converting the text to vector space")
-        vectorizer = TfidfVectorizer(input="content", vocabulary=self.__tfidf.get_feature_names())
+        vectorizer = TfidfVectorizer(input="content", vocabulary=self.__feature_names)
         query_string = " ".join(query)
-        logging.debug("Query string %s", query_string)
         vector = vectorizer.fit_transform([query_string]).toarray()
         return vector
 
@@ -171,10 +243,12 @@ class HAL(object):
         [(1, 0.708)]
         _
         """
-        logging.info("Search semantically")
-        qtm = self.convert_to_vector_space(query)
-        results1 = self.keyword_search(query, qtm)
-        results2 = self.co_occurrence_search(query, qtm)
+        with instrumentation.timer("hal.vectorize"):
+            qtm = self.convert_to_vector_space(query)
+        with instrumentation.timer("hal.keyword_search"):
+            results1 = self.keyword_search(query, qtm)
+        with instrumentation.timer("hal.co_occurrence_search"):
+            results2 = self.co_occurrence_search(query, qtm)
 
         results = results1 + results2
 
@@ -183,12 +257,75 @@ class HAL(object):
             k, v = l
             clusterer[k].append(v)
 
-        final_results = clusterer.items()
+        final_results = list(clusterer.items())
 
         final_results.sort(key=lambda tup: tup[1][0], reverse=True)
-        logging.debug("Semantic search result %s", final_results)
+        instrumentation.increment("hal.candidates", len(final_results))
+        logger.debug("Semantic search result %s", final_results)
         return final_results
 
+    def semantic_search_many(self, queries):
+        """Search for documents semantically for many queries at once.
+
+        Gives the same results as semantic_search for each query (up to the order of equal
+        scores), but the queries are vectorized together and scored against all the documents with
+        one matrix product.
+
+        :param queries: list of queries (list of text)
+        :type queries: list<list<string>>
+        :returns: list of document ids and scores of each query
+        :rtype: list<list<(int, list<float>)>>
+
+        :Example:
+
+        >>> hal.semantic_search_many([["php", "session"], ["java", "thread"]])
+        [[(1, [0.708])], [(0, [0.5, 0.5])]]
+        """
+        if not queries:
+            return []
+        with instrumentation.timer("hal.vectorize"):
+            counts = CountVectorizer(vocabulary=self.__feature_names).transform(
+                [" ".join(query) for query in queries])
+            qtm = np.asarray(counts.todense(), dtype=np.float64)
+            # Same as the l2 normalized tf-idf of a single query, where every present term has idf 1
+            query_norms = LA.norm(qtm, axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                qtm = qtm / query_norms[:, None]
+        with instrumentation.timer("hal.score"):
+            document_norms = LA.norm(self.__dtm, axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scores = np.round(qtm.dot(self.__dtm.T) / (LA.norm(qtm, axis=1)[:, None] * document_norms[None, :]),
+                                  3)
+
+        all_results = []
+        for query, query_scores in zip(queries, scores):
+            with instrumentation.timer("hal.keyword_search"):
+                term_ids = [term_id for term_id in (self.get_term_id(term) for term in query) if term_id is not None]
+                results1 = self.__top(self.__dtm[:, term_ids], query_scores, self.__threshold, "hal.keyword_search")
+            with instrumentation.timer("hal.co_occurrence_search"):
+                related_term_ids = sorted(set(self.get_related_vocabulary(query)))
+                instrumentation.increment("hal.co_occurrence_search.terms", len(related_term_ids))
+                results2 = self.__top(self.__dtm[:, related_term_ids], query_scores, 0, "hal.co_occurrence_search")
+
+            clusterer = collections.defaultdict(list)
+            for k, v in results1 + results2:
+                clusterer[k].append(v)
+            final_results = list(clusterer.items())
+            final_results.sort(key=lambda tup: tup[1][0], reverse=True)
+            instrumentation.increment("hal.candidates", len(final_results))
+            all_results.append(final_results)
+        return all_results
+
+    @staticmethod
+    def __top(term_columns, scores, threshold, stage):
+        # Documents containing any of the terms and scoring above threshold, best 10 first
+        ids = np.nonzero((term_columns != 0).any(axis=1))[0]
+        results = [(id, float(scores[id])) for id in ids if scores[id] > threshold]
+        results.sort(key=lambda tup: tup[1], reverse=True)
+        instrumentation.increment(stage + ".candidates", len(ids))
+        instrumentation.increment(stage + ".results", min(len(results), 10))
+        return results[:10]
+
     def co_occurrence_search(self, query, qtm):
         """Search for a document using co-occurrence of words.
 
@@ -210,16 +347,18 @@ class HAL(object):
         [(1, 0.708)]
         _
         """
-        logging.info("Co-occurrence search")
         semantic_term_ids = set(self.get_related_vocabulary(query))
+        instrumentation.increment("hal.co_occurrence_search.terms", len(semantic_term_ids))
         doc_ids = []
         for term_id in semantic_term_ids:
             docs = np.where(self.__dtm[:, term_id] != 0)[0]
             doc_ids.extend(docs)
+        doc_ids = set(doc_ids)
+        instrumentation.increment("hal.co_occurrence_search.candidates", len(doc_ids))
 
         # semantic_term_id_list = np.array(list(semantic_term_ids))
         results = []
-        for id in set(doc_ids):
+        for id in doc_ids:
             cos = self.cosine(qtm, self.__dtm[id])
             if cos > 0:
                 doc = (id, cos)
@@ -232,6 +371,7 @@ class HAL(object):
             # results.append(doc)
 
         results.sort(key=lambda tup: tup[1], reverse=True)
+        instrumentation.increment("hal.co_occurrence_search.results", min(len(results), 10))
         return results[:10]
 
     '''
@@ -289,7 +429,6 @@ class HAL(object):
         [(1, 0.708)]
         _
         """
-        logging.info("Keywords search")
         term_ids = []
         for term in query:
             term_id = self.get_term_id(term)
@@ -299,20 +438,22 @@ class HAL(object):
         doc_ids = []
         for term_id in term_ids:
             doc_ids.extend(np.where(self.__dtm[:, term_id] != 0)[0])
+        doc_ids = set(doc_ids)
+        instrumentation.increment("hal.keyword_search.candidates", len(doc_ids))
 
         results = []
-        for id in set(doc_ids):
+        for id in doc_ids:
             cos = self.cosine(qtm, self.__dtm[id])
             if cos > self.__threshold:
                 doc = (id, cos)
                 results.append(doc)
 
         results.sort(key=lambda tup: tup[1], reverse=True)
+        instrumentation.increment("hal.keyword_search.results", min(len(results), 10))
         return results[:10]
 
     def get_related_vocabulary(self, query):
         """Get co-occurring terms in the vocabulary"""
-        logging.info("Started getting related vocabulary")
         word_ids = []
         for term in query:
             term_id = np.where(self.__vocabulary == term)[0]
@@ -336,7 +477,6 @@ class HAL(object):
         >>> hal.get_term_id('apple')
         21
         """
-        logging.info("Get term id")
         term_id = np.where(self.__vocabulary == term)[0]
         if len(term_id) > 0:
             return term_id[0]
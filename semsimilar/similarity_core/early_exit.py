@@ -0,0 +1,115 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+import threading
+from semsimilar import instrumentation
+
+
+class EarlyExitPolicy(object):
+    """Decide which HAL candidates need Lesk re-ranking
+
+    HAL candidates scoring at least margin above the first candidate outside the top count, or
+    at least exact_score (a near exact keyword match), are kept in HAL order without Lesk.
+    Candidates scoring at least margin below the last candidate inside the top count are dropped.
+    Only the ambiguous candidates in between are re-ranked with Lesk, and Lesk is skipped when
+    the kept candidates fill the results.
+
+    :param margin: HAL score gap (0-1) that makes a candidate certain to be in or out of the results
+    :param exact_score: HAL score (0-1) treated as an exact keyword match
+    :type margin: float
+    :type exact_score: float
+    :returns: early exit policy
+    :rtype: semsimilar.semsimilar.similarity_core.early_exit.EarlyExitPolicy
+
+    **Property**:
+     - margin
+     - exact_score
+
+    :Example:
+
+    >>> policy = EarlyExitPolicy(margin=0.2)
+    >>> ss_similarity(corpus, doc, hal, 10, early_exit=policy)
+    >>> policy.stats()
+    {'queries': 1, 'skipped': 1, 'narrowed': 0, 'skip_rate': 1.0, 'narrow_rate': 0.0}
+    """
+
+    def __init__(self, margin=0.2, exact_score=0.95):
+        self.__margin = margin
+        self.__exact_score = exact_score
+        self.__lock = threading.Lock()
+        self.queries = self.skipped = self.narrowed = 0
+
+    @property
+    def margin(self):
+        return self.__margin
+
+    @property
+    def exact_score(self):
+        return self.__exact_score
+
+    def settings(self):
+        """Get the values that affect the results
+
+        :returns: margin and exact score
+        :rtype: tuple
+        """
+        return self.__margin, self.__exact_score
+
+    def split(self, candidates, count):
+        """Split HAL candidates into those kept as ranked by HAL and those to be re-ranked
+
+        :param candidates: HAL results (document id and scores) in HAL score order
+        :param count: number of results wanted
+        :type candidates: list<(int, list<float>)>
+        :type count: int
+        :returns: candidates kept (at most count) and ambiguous candidates to be re-ranked
+        :rtype: (list<(int, list<float>)>, list<(int, list<float>)>)
+        """
+        count = max(count, 1)
+        scores = [candidate_scores[0] for candidate_id, candidate_scores in candidates]
+        outside = scores[count] if len(scores) > count else 0
+        inside = scores[min(count, len(scores)) - 1] if scores else 0
+        kept = []
+        ambiguous = []
+        for candidate, score in zip(candidates, scores):
+            if len(kept) < count and not ambiguous and (score >= outside + self.__margin or
+                                                        score >= self.__exact_score):
+                kept.append(candidate)
+            elif score > inside - self.__margin:
+                ambiguous.append(candidate)
+        if len(kept) == count:
+            ambiguous = []
+
+        with self.__lock:
+            self.queries += 1
+            if not ambiguous:
+                self.skipped += 1
+            elif len(kept) + len(ambiguous) < len(candidates):
+                self.narrowed += 1
+        if not ambiguous:
+            instrumentation.increment("early_exit.skipped")
+        elif len(kept) + len(ambiguous) < len(candidates):
+            instrumentation.increment("early_exit.narrowed")
+        return kept, ambiguous
+
+    def stats(self):
+        """Get how often Lesk was skipped or given fewer candidates
+
+        :returns: queries, skipped, narrowed, skip_rate and narrow_rate
+        :rtype: dict
+        """
+        with self.__lock:
+            queries = self.queries
+            return {
+                "queries": queries,
+                "skipped": self.skipped,
+                "narrowed": self.narrowed,
+                "skip_rate": float(self.skipped) / queries if queries else 0.0,
+                "narrow_rate": float(self.narrowed) / queries if queries else 0.0
+            }
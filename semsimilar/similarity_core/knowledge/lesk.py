@@ -11,18 +11,61 @@ from nltk.corpus import wordnet as wn
 from nltk.metrics import distance
 import ngram
 import logging
+import timeit
+from semsimilar import instrumentation
+from semsimilar.cache import LRUCache
+from semsimilar.similarity_core.results import SearchResults
 
-def similarity(documents, new_document, count):
+logger = logging.getLogger(__name__)
+
+# Path similarity of synset pairs, shared by all the searches (and batches of searches)
+similarity_cache = LRUCache(max_size=500000)
+
+_missing = object()
+
+
+def set_similarity_cache(max_size=500000):
+    """Replace the synset path similarity cache
+
+    :param max_size: maximum number of synset pairs kept (0 disables caching)
+    :type max_size: int
+    :returns: the new cache
+    :rtype: semsimilar.semsimilar.cache.LRUCache
+
+    :Example:
+
+    >>> set_similarity_cache(1000000)
+    """
+    global similarity_cache
+    similarity_cache = LRUCache(max_size=max_size)
+    return similarity_cache
+
+
+def get_similarity_cache_stats():
+    """Get hit/miss counters of the synset path similarity cache
+
+    :returns: cache statistics
+    :rtype: dict
+    """
+    return similarity_cache.stats()
+
+
+def similarity(documents, new_document, count, deadline=None):
     """Get most similar documents using lexical and string based calculations
 
+    Documents are scored in the given order. If a deadline is given, scoring stops when it is
+    reached and the best of the documents scored so far are returned, flagged as partial.
+
     :param documents: documents list
     :param new_document: document to search
     :param count: number of results wanted
+    :param deadline: time (timeit.default_timer) to stop scoring at
     :type documents: list<semsimilar.semsimilar.model.document.Document>
     :type new_document: semsimilar.semsimilar.model.document.Document
     :type count: int
+    :type deadline: float
     :returns: Top matched documents with their scores (0-1)
-    :rtype: list<(semsimilar.semsimilar.model.document.Document, float)>
+    :rtype: semsimilar.semsimilar.similarity_core.results.SearchResults
 
     :Example:
 
@@ -33,13 +76,18 @@ def similarity(documents, new_document, count):
     >>> similarity(documents, doc, 1)
     [(document, 0.708)]
     """
-    logger = logging.getLogger(__name__)
-    logger.info("Lesk similarity calculation started")
+    logger.debug("Lesk similarity calculation started")
     count = __validate_count(count)
 
+    # Document properties are decoded from ids on each access, so each is read once per document
+    query = (new_document.synsets, new_document.synset_tokens)
     results = []
+    partial = False
     for document in documents:
-        score = __get_score(new_document, document)
+        if deadline is not None and timeit.default_timer() >= deadline:
+            partial = True
+            break
+        score = __get_score(query, document)
         if len(results) < count:
             result = (document, score)
             results.append(result)
@@ -50,8 +98,10 @@ def similarity(documents, new_document, count):
             result = (document, score)
             results.append(result)
             results.sort(key=lambda tup: tup[1], reverse=True)
-    logger.info("Lesk similarity calculation finished")
-    return results
+    # Fewer documents than count are not sorted by the loop
+    results.sort(key=lambda tup: tup[1], reverse=True)
+    logger.debug("Lesk similarity calculation finished")
+    return SearchResults(results, partial)
 
 
 def __validate_count(count):
@@ -62,31 +112,28 @@ def __validate_count(count):
         return default_count
 
 
-def __get_score(new_doc, doc):
-    """Get similarity score"""
-    logger = logging.getLogger(__name__)
-    logger.info("Started calculating score")
-    if new_doc.synsets is None or doc.synsets is None:
+def __get_score(query, doc):
+    """Get similarity score of a document for the synsets and synset tokens of the query"""
+    instrumentation.increment("lesk.pairs")
+    new_synsets, new_tokens = query
+    synsets = doc.synsets
+    if new_synsets is None or synsets is None:
         return 0
+    tokens = doc.synset_tokens
     # total1 = __calculate_semantic_score(new_doc.synsets, doc.synsets)
-    total1 = __calculate_semantic_score(new_doc.synsets, doc.synsets) + __calculate_string_score(new_doc.synsets,
-                                                                                                 new_doc.synset_tokens,
-                                                                                                 doc.synset_tokens)
-    logger.debug(total1)
-    # total2 = __calculate_semantic_score(doc.synsets, new_doc.synsets)
-
-    total2 = __calculate_semantic_score(doc.synsets, new_doc.synsets) + __calculate_string_score(doc.synsets,
-                                                                                                 doc.synset_tokens,
-                                                                                                 new_doc.synset_tokens)
-    logger.debug(total2)
-    logger.info("Finished calculating score")
-    return (total1 + total2) / (len(doc.synset_tokens) + len(new_doc.synset_tokens))
+    with instrumentation.timer("lesk.semantic_score"):
+        semantic1 = __calculate_semantic_score(new_synsets, synsets)
+        semantic2 = __calculate_semantic_score(synsets, new_synsets)
+    with instrumentation.timer("lesk.string_score"):
+        string1 = __calculate_string_score(new_synsets, new_tokens, tokens)
+        string2 = __calculate_string_score(synsets, tokens, new_tokens)
+    total1 = semantic1 + string1
+    total2 = semantic2 + string2
+    return (total1 + total2) / (len(tokens) + len(new_tokens))
 
 
 def __calculate_string_score(synsets, tokens1, tokens2):
     """Calculate string based similarity score"""
-    logger = logging.getLogger(__name__)
-    logger.info("String-based similarity started")
     total = 0
     for index, syn in enumerate(synsets, start=0):
         max = 0
@@ -97,25 +144,29 @@ def __calculate_string_score(synsets, tokens1, tokens2):
                 if sim is not None and sim > max:
                     max = sim
         total += max
-    logger.debug("String-based similarity score for %s and %s is %s", tokens1, tokens2, total)
-    logger.info("String-based similarity finished")
     return total
 
 
 def __calculate_semantic_score(synsets1, synsets2):
     """Calculate semantic score using wordnet"""
-    logger = logging.getLogger(__name__)
-    logger.info("Path length calculation started")
     total = 0
     for syn1 in synsets1:
         max = 0
         if syn1 is not None:
             for syn2 in synsets2:
                 if syn2 is not None:
-                    sim = wn.synset(syn1).path_similarity(wn.synset(syn2))
+                    sim = __path_similarity(syn1, syn2)
                     if sim is not None and sim > max:
                         max = sim
         total += max
-    logger.debug("Score for synsets %s and %s is %s", synsets1, synsets2, total)
-    logger.info("Path length calculation finished")
     return total
+
+
+def __path_similarity(syn1, syn2):
+    """Get the path similarity of two synsets through similarity_cache"""
+    key = (syn1, syn2)
+    sim = similarity_cache.get(key, _missing)
+    if sim is _missing:
+        sim = wn.synset(syn1).path_similarity(wn.synset(syn2))
+        similarity_cache.put(key, sim)
+    return sim
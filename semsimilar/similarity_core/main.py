@@ -8,24 +8,79 @@ __version__ = "1.0.0"
 __email__ = "uslperera@gmail.com"
 
 from semsimilar.similarity_core.knowledge import lesk as lesk
+from semsimilar.similarity_core.results import SearchResults
+from semsimilar.cache import LRUCache
+from semsimilar import instrumentation
 import logging
+import timeit
 
+logger = logging.getLogger(__name__)
 
-def ss_similarity(documents, new_document, hal_model, count):
+# Search results keyed on the query tokens, count, query configuration and model versions
+query_cache = LRUCache(max_size=10000, ttl=300)
+
+
+def set_query_cache(max_size=10000, ttl=300):
+    """Replace the search result cache
+
+    :param max_size: maximum number of queries kept (0 disables caching)
+    :param ttl: seconds a result is reused (None keeps results until evicted)
+    :type max_size: int
+    :type ttl: float
+    :returns: the new cache
+    :rtype: semsimilar.semsimilar.cache.LRUCache
+
+    :Example:
+
+    >>> set_query_cache(50000, 60)
+    """
+    global query_cache
+    query_cache = LRUCache(max_size=max_size, ttl=ttl)
+    return query_cache
+
+
+def get_query_cache_stats():
+    """Get hit/miss counters of the search result cache
+
+    :returns: cache statistics
+    :rtype: dict
+    """
+    return query_cache.stats()
+
+
+def ss_similarity(documents, new_document, hal_model, count, pool=None, budget=None, max_candidates=None,
+                  early_exit=None, use_cache=True):
     """Find documents using SemSimilar similarity.
 
     Both HAL and Lesk based similarity calculations are used to find the most related documents.
+    HAL candidates are re-ranked with Lesk in HAL score order, so with a time budget the
+    candidates HAL ranks highest are scored first. When the budget runs out the best results
+    scored so far are returned flagged as partial (the HAL ranking with HAL scores if Lesk did
+    not score any candidate). With an early exit policy, candidates HAL ranks decisively keep
+    their HAL order and scores, and only the ambiguous ones are re-ranked with Lesk.
+    Results are cached in query_cache when documents is a Corpus. Adding documents to the corpus
+    or changing the HAL model changes their versions, so older results are not returned.
 
-    :param documents: documents list
+    :param documents: documents in the row order of the HAL model
     :param new_document: document to search
     :param hal_model: HAL model created from existing documents
     :param count: number of results wanted
-    :type documents: list<semsimilar.semsimilar.model.document.Document>
+    :param pool: warm worker pool used for Lesk scoring, the calling process if None
+    :param budget: seconds the search may take (no limit if None)
+    :param max_candidates: maximum number of HAL candidates re-ranked with Lesk (all if None)
+    :param early_exit: policy deciding when Lesk can be skipped (Lesk is always used if None)
+    :param use_cache: read and store the results in query_cache (False searches again, e.g. to trace the stages)
+    :type documents: semsimilar.semsimilar.model.corpus.Corpus, list<semsimilar.semsimilar.model.document.Document>
     :type new_document: semsimilar.semsimilar.model.document.Document
     :type hal_model: semsimilar.semsimilar.similarity_core.corpus.hal.Hal
     :type count: int
+    :type pool: semsimilar.semsimilar.model.document_worker.WorkerPool
+    :type budget: float
+    :type max_candidates: int
+    :type early_exit: semsimilar.semsimilar.similarity_core.early_exit.EarlyExitPolicy
+    :type use_cache: bool
     :returns: Top matched documents with their scores (0-1)
-    :rtype: list<(semsimilar.semsimilar.model.document.Document, float)>
+    :rtype: semsimilar.semsimilar.similarity_core.results.SearchResults
 
     :Example:
 
@@ -35,13 +90,158 @@ def ss_similarity(documents, new_document, hal_model, count):
         "<security><php>")
     >>> ss_similarity(documents, doc, hal, 1)
     [(document, 0.708)]
+    >>> ss_similarity(documents, doc, hal, 10, budget=0.2, max_candidates=100).partial
+    False
+    """
+
+    return ss_similarity_many(documents, [new_document], hal_model, count, pool, budget, max_candidates,
+                              early_exit, use_cache)[0]
+
+
+def ss_similarity_many(documents, new_documents, hal_model, count, pool=None, budget=None, max_candidates=None,
+                       early_exit=None, use_cache=True):
+    """Find documents using SemSimilar similarity for many queries at once.
+
+    Same as ss_similarity for each query, but the queries not found in query_cache are scored by
+    HAL together (when the model has semantic_search_many). The budget is shared by the batch.
+
+    :param documents: documents in the row order of the HAL model
+    :param new_documents: documents to search
+    :param hal_model: HAL model created from existing documents
+    :param count: number of results wanted for each query
+    :param pool: warm worker pool used for Lesk scoring, the calling process if None
+    :param budget: seconds the searches may take (no limit if None)
+    :param max_candidates: maximum number of HAL candidates re-ranked with Lesk (all if None)
+    :param early_exit: policy deciding when Lesk can be skipped (Lesk is always used if None)
+    :param use_cache: read and store the results in query_cache
+    :type documents: semsimilar.semsimilar.model.corpus.Corpus, list<semsimilar.semsimilar.model.document.Document>
+    :type new_documents: list<semsimilar.semsimilar.model.document.Document>
+    :type hal_model: semsimilar.semsimilar.similarity_core.corpus.hal.Hal
+    :type count: int
+    :type pool: semsimilar.semsimilar.model.document_worker.WorkerPool
+    :type budget: float
+    :type max_candidates: int
+    :type early_exit: semsimilar.semsimilar.similarity_core.early_exit.EarlyExitPolicy
+    :type use_cache: bool
+    :returns: Top matched documents with their scores (0-1) for each query
+    :rtype: list<semsimilar.semsimilar.similarity_core.results.SearchResults>
+
+    :Example:
+
+    >>> ss_similarity_many(documents, [QueryDocument("php session"), QueryDocument("java thread")], hal, 10)
+    [[(document, 0.708)], [(document, 0.5)]]
     """
+    logger.debug("ss_similarity started")
+    deadline = None
+    if budget is not None:
+        deadline = timeit.default_timer() + budget
 
-    logger = logging.getLogger(__name__)
-    logger.info("ss_similarity started")
-    results_topic = hal_model.semantic_search(new_document.stemmed_tokens)
+    all_results = [None] * len(new_documents)
+    keys = []
+    misses = []
+    for index, new_document in enumerate(new_documents):
+        key = None
+        if use_cache:
+            key = query_key(documents, new_document, hal_model, count, max_candidates, early_exit)
+        keys.append(key)
+        all_results[index] = get_cached_results(key)
+        if all_results[index] is None:
+            misses.append(index)
+    if not misses:
+        return all_results
+
+    all_results_topic = hal_candidates(hal_model, [new_documents[index] for index in misses])
+    for index, results_topic in zip(misses, all_results_topic):
+        all_results[index] = rerank(documents, new_documents[index], results_topic, count, pool, deadline,
+                                    max_candidates, early_exit, keys[index])
+    return all_results
+
+
+def query_key(documents, new_document, hal_model, count, max_candidates=None, early_exit=None):
+    """Get the key identifying the results of a search (see ss_similarity for the arguments)
+
+    :returns: key of query_cache, or None if the documents or the model are not versioned
+    :rtype: tuple
+    """
+    corpus_version = getattr(documents, "version", None)
+    model_version = getattr(hal_model, "version", None)
+    if corpus_version is None or model_version is None:
+        return None
+    if early_exit is not None:
+        early_exit = early_exit.settings()
+    return (tuple(new_document.tokens), count, max_candidates, early_exit, new_document.config.settings(),
+            model_version, corpus_version)
+
+
+def get_cached_results(key):
+    """Get the results of a search from query_cache
+
+    :param key: key given by query_key (None is never found)
+    :type key: tuple
+    :returns: Top matched documents with their scores (0-1), or None if not cached
+    :rtype: semsimilar.semsimilar.similarity_core.results.SearchResults
+    """
+    if key is None:
+        return None
+    results = query_cache.get(key)
+    if results is None:
+        return None
+    logger.debug("Retrieved results from the query cache")
+    instrumentation.increment("search.cache_hits")
+    return SearchResults(results)
+
+
+def hal_candidates(hal_model, new_documents):
+    """Find the HAL candidates of queries, scored together when the model has semantic_search_many
+
+    :param hal_model: HAL model created from existing documents
+    :param new_documents: documents to search
+    :type hal_model: semsimilar.semsimilar.similarity_core.corpus.hal.Hal
+    :type new_documents: list<semsimilar.semsimilar.model.document.Document>
+    :returns: row ids of the candidates with their scores, in HAL score order, for each query
+    :rtype: list<list<(int, list<float>)>>
+    """
+    queries = [new_document.stemmed_tokens for new_document in new_documents]
+    with instrumentation.timer("hal"):
+        if hasattr(hal_model, "semantic_search_many"):
+            all_results_topic = hal_model.semantic_search_many(queries)
+        else:
+            all_results_topic = [hal_model.semantic_search(query) for query in queries]
     logger.debug("Retrieved results from hal")
-    results_ontology = []
+    return all_results_topic
+
+
+def rerank(documents, new_document, results_topic, count, pool=None, deadline=None, max_candidates=None,
+           early_exit=None, key=None):
+    """Re-rank the HAL candidates of a query with Lesk (see ss_similarity for the other arguments)
+
+    :param results_topic: HAL candidates of the query (see hal_candidates)
+    :param deadline: time (timeit.default_timer) to stop scoring at
+    :param key: key the results are put in query_cache under, unless partial (not cached if None)
+    :type results_topic: list<(int, list<float>)>
+    :type deadline: float
+    :type key: tuple
+    :returns: Top matched documents with their scores (0-1)
+    :rtype: semsimilar.semsimilar.similarity_core.results.SearchResults
+    """
+    results_ontology = __rerank(documents, new_document, results_topic, count, pool, deadline, max_candidates,
+                                early_exit)
+    if key is not None and not results_ontology.partial:
+        query_cache.put(key, tuple(results_ontology))
+    return results_ontology
+
+
+def __rerank(documents, new_document, results_topic, count, pool, deadline, max_candidates, early_exit):
+    """Re-rank the HAL results of a query with Lesk"""
+    results_ontology = SearchResults()
+    kept = []
+    if results_topic:
+        if max_candidates is not None:
+            results_topic = results_topic[:max(max_candidates, 1)]
+        if early_exit is not None:
+            kept, results_topic = early_exit.split(results_topic, count)
+            kept = [(documents[topic_document_id], scores[0]) for topic_document_id, scores in kept]
+            results_ontology = SearchResults(kept)
     if results_topic:
         topic_document_ids, scores = zip(*results_topic)
 
@@ -49,6 +249,20 @@ def ss_similarity(documents, new_document, hal_model, count):
         for topic_document_id in topic_document_ids:
             topic_documents.append(documents[topic_document_id])
 
-        results_ontology = lesk.similarity(documents=topic_documents, new_document=new_document, count=count)
+        remaining = max(count, 1) - len(kept)
+        instrumentation.increment("lesk.candidates", len(topic_documents))
+        with instrumentation.timer("lesk"):
+            if pool is None:
+                results_ontology = lesk.similarity(documents=topic_documents, new_document=new_document,
+                                                   count=remaining, deadline=deadline)
+            else:
+                results_ontology = pool.similarity(topic_documents, new_document, remaining, deadline)
         logger.debug("Retrieved results from lesk")
+        if results_ontology.partial:
+            logger.info("Search deadline reached, returning partial results")
+            if not results_ontology:
+                results_ontology = SearchResults([(document, score[0]) for document, score in
+                                                  zip(topic_documents, scores)][:remaining], True)
+        results_ontology = SearchResults(kept + results_ontology, results_ontology.partial)
+    instrumentation.increment("search.results", len(results_ontology))
     return results_ontology
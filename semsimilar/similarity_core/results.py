@@ -0,0 +1,32 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+
+class SearchResults(list):
+    """Matched documents with their scores, flagged if the search was cut short by a deadline
+
+    Behaves as the list of (document, score) tuples returned before, with a partial attribute.
+
+    :param results: matched documents with their scores
+    :param partial: whether the search stopped at its deadline before scoring every candidate
+    :type results: list<(semsimilar.semsimilar.model.document.Document, float)>
+    :type partial: bool
+    :returns: search results
+    :rtype: semsimilar.semsimilar.similarity_core.results.SearchResults
+
+    :Example:
+
+    >>> results = ss_similarity(corpus, doc, hal, 10, budget=0.2)
+    >>> results.partial
+    False
+    """
+
+    def __init__(self, results=(), partial=False):
+        super(SearchResults, self).__init__(results)
+        self.partial = partial
@@ -0,0 +1,195 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+import logging
+import threading
+import timeit
+from semsimilar.similarity_core.main import query_key, get_cached_results, hal_candidates, rerank
+from semsimilar.similarity_core.results import SearchResults
+
+logger = logging.getLogger(__name__)
+
+
+class _Request(object):
+    __slots__ = ("key", "new_document", "count", "deadline", "scored", "done", "results_topic", "results",
+                 "error")
+
+    def __init__(self, key, new_document, count, deadline):
+        self.key = key
+        self.new_document = new_document
+        self.count = count
+        self.deadline = deadline
+        self.scored = threading.Event()
+        self.done = threading.Event()
+        self.results_topic = None
+        self.results = None
+        self.error = None
+
+
+class SearchScheduler(object):
+    """Share and batch concurrent searches over one corpus and HAL model
+
+    Identical searches (same query_key) in flight at the same time share one computation.
+    Distinct queries arriving within batch_window seconds of each other are scored by HAL
+    together (see hal_candidates). The first request of a batch waits for the window and runs the
+    HAL scoring in its own thread. Each request then re-ranks its candidates with Lesk in its own
+    thread, against a deadline counted from when it arrived, so queries in a batch do not wait for
+    each other's re-ranking. The documents, model and options are fixed, so a new scheduler is
+    created for a new corpus or model.
+
+    :param documents: documents in the row order of the HAL model
+    :param hal_model: HAL model created from existing documents
+    :param batch_window: seconds a batch stays open for more queries (0 batches only queries already waiting)
+    :param max_batch: number of queries that closes a batch early
+    :param options: other arguments of ss_similarity (pool, budget, max_candidates, early_exit)
+    :type documents: semsimilar.semsimilar.model.corpus.Corpus
+    :type hal_model: semsimilar.semsimilar.similarity_core.corpus.hal.Hal
+    :type batch_window: float
+    :type max_batch: int
+    :returns: search scheduler
+    :rtype: semsimilar.semsimilar.similarity_core.scheduler.SearchScheduler
+
+    **Property**:
+     - documents
+     - hal_model
+     - options
+
+    :Example:
+
+    >>> scheduler = SearchScheduler(corpus, hal, batch_window=0.005, budget=1.0)
+    >>> scheduler.search(QueryDocument("php session"), 10)
+    [(document, 0.708)]
+    """
+
+    def __init__(self, documents, hal_model, batch_window=0.005, max_batch=32, **options):
+        self.__documents = documents
+        self.__hal_model = hal_model
+        self.__batch_window = batch_window
+        self.__max_batch = max_batch
+        self.__options = options
+        self.__pool = options.get("pool")
+        self.__budget = options.get("budget")
+        self.__max_candidates = options.get("max_candidates")
+        self.__early_exit = options.get("early_exit")
+        self.__lock = threading.Lock()
+        self.__in_flight = {}
+        self.__pending = []
+        self.__full = threading.Event()
+        self.requests = self.coalesced = self.batches = self.batched = 0
+
+    @property
+    def documents(self):
+        return self.__documents
+
+    @property
+    def hal_model(self):
+        return self.__hal_model
+
+    @property
+    def options(self):
+        return dict(self.__options)
+
+    def search(self, new_document, count):
+        """Find documents using SemSimilar similarity (see ss_similarity)
+
+        :param new_document: document to search
+        :param count: number of results wanted
+        :type new_document: semsimilar.semsimilar.model.query_document.QueryDocument
+        :type count: int
+        :returns: Top matched documents with their scores (0-1)
+        :rtype: semsimilar.semsimilar.similarity_core.results.SearchResults
+        """
+        deadline = None
+        if self.__budget is not None:
+            deadline = timeit.default_timer() + self.__budget
+        key = query_key(self.__documents, new_document, self.__hal_model, count, self.__max_candidates,
+                        self.__early_exit)
+        results = get_cached_results(key)
+        if results is not None:
+            with self.__lock:
+                self.requests += 1
+            return results
+
+        with self.__lock:
+            self.requests += 1
+            request = self.__in_flight.get(key) if key is not None else None
+            owner = request is None
+            if owner:
+                request = _Request(key, new_document, count, deadline)
+                if key is not None:
+                    self.__in_flight[key] = request
+                self.__pending.append(request)
+                leader = len(self.__pending) == 1
+                if len(self.__pending) >= self.__max_batch:
+                    self.__full.set()
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if leader:
+            self.__run_batch()
+        if owner:
+            self.__rerank(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return SearchResults(request.results, request.results.partial)
+
+    def __run_batch(self):
+        if self.__batch_window > 0:
+            self.__full.wait(self.__batch_window)
+        with self.__lock:
+            batch = self.__pending
+            self.__pending = []
+            self.__full.clear()
+            self.batches += 1
+            self.batched += len(batch)
+        logger.debug("Scoring a batch of %s queries with HAL", len(batch))
+
+        try:
+            all_results_topic = hal_candidates(self.__hal_model, [request.new_document for request in batch])
+            for request, results_topic in zip(batch, all_results_topic):
+                request.results_topic = results_topic
+        except Exception as error:
+            for request in batch:
+                request.error = error
+        finally:
+            for request in batch:
+                request.scored.set()
+
+    def __rerank(self, request):
+        # Re-ranks the candidates of a request in the thread of its owner, then releases the
+        # requests sharing it
+        request.scored.wait()
+        try:
+            if request.error is None:
+                request.results = rerank(self.__documents, request.new_document, request.results_topic,
+                                         request.count, self.__pool, request.deadline, self.__max_candidates,
+                                         self.__early_exit, request.key)
+        except Exception as error:
+            request.error = error
+        finally:
+            if request.key is not None:
+                with self.__lock:
+                    del self.__in_flight[request.key]
+            request.done.set()
+
+    def stats(self):
+        """Get how many searches were shared or batched
+
+        :returns: requests, coalesced (shared an identical search), batches and average batch size
+        :rtype: dict
+        """
+        with self.__lock:
+            return {
+                "requests": self.requests,
+                "coalesced": self.coalesced,
+                "batches": self.batches,
+                "average_batch": float(self.batched) / self.batches if self.batches else 0.0
+            }
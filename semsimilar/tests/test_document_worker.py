@@ -0,0 +1,50 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+import time
+import timeit
+import unittest
+from semsimilar.model.document_worker import WorkerPool
+
+
+def sleep_task(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+class WorkerPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = WorkerPool(1, warm=False)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_map_until_returns_every_result_in_order(self):
+        results, partial = self.pool.map_until(sleep_task, [0.03, 0.01, 0.02])
+        self.assertEqual(results, [0.03, 0.01, 0.02])
+        self.assertFalse(partial)
+
+    def test_map_until_stops_at_the_deadline(self):
+        results, partial = self.pool.map_until(sleep_task, [0.01, 0.3, 0.3, 0.3], timeit.default_timer() + 0.15)
+        self.assertEqual(results, [0.01])
+        self.assertTrue(partial)
+
+    def test_overloaded_pool_does_not_keep_abandoned_work(self):
+        # Each call would queue 2 seconds of work if every argument was submitted up front
+        for _ in range(5):
+            results, partial = self.pool.map_until(sleep_task, [0.1] * 20, timeit.default_timer() + 0.05)
+            self.assertTrue(partial)
+        results, partial = self.pool.map_until(sleep_task, [0.01], timeit.default_timer() + 1.0)
+        self.assertEqual(results, [0.01])
+        self.assertFalse(partial)
+
+
+if __name__ == '__main__':
+    unittest.main()
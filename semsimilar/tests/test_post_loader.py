@@ -0,0 +1,54 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+import io
+import json
+import unittest
+from semsimilar.model.post_loader import iter_json_array
+
+
+class CountingFile(io.StringIO):
+
+    def __init__(self, text):
+        super(CountingFile, self).__init__(text)
+        self.characters_read = 0
+
+    def read(self, size=-1):
+        data = super(CountingFile, self).read(size)
+        self.characters_read += len(data)
+        return data
+
+
+class IterJsonArrayTest(unittest.TestCase):
+
+    def test_reads_objects_split_across_buffers(self):
+        posts = [{u"Id": index, u"Title": u"post title %d" % index} for index in range(20)]
+        json_file = io.StringIO(json.dumps(posts))
+        self.assertEqual(list(iter_json_array(json_file, buffer_size=7)), posts)
+
+    def test_scalar_cut_by_the_buffer_is_not_truncated(self):
+        # The first read ends inside 23456 and the second inside true
+        json_file = io.StringIO(u"[1, 23456, tru" u"e, 7.5e3]")
+        self.assertEqual(list(iter_json_array(json_file, buffer_size=5)), [1, 23456, True, 7500.0])
+
+    def test_malformed_record_fails_before_reading_the_rest(self):
+        records = u", ".join(u'{"Id": %d}' % index for index in range(1000))
+        json_file = CountingFile(u'[{"Id": 0}, {"Id" 1}, ' + records + u"]")
+        with self.assertRaises(ValueError):
+            list(iter_json_array(json_file, buffer_size=16))
+        self.assertLess(json_file.characters_read, 64)
+
+    def test_truncated_array_fails(self):
+        json_file = io.StringIO(u'[{"Id": 1}, {"Id": 2')
+        with self.assertRaises(ValueError):
+            list(iter_json_array(json_file, buffer_size=4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+import unittest
+from semsimilar.textprocessor.tokenize import CodeTokenizer
+
+
+class CodeTokenizerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tokenizer = CodeTokenizer()
+
+    def test_iter_tokenize_gives_the_words_of_tokenize(self):
+        for text in ["Stream of text 123", "PHP session (security)?", "I don't know, why.", "a/b <c> - d"]:
+            self.assertEqual(list(self.tokenizer.iter_tokenize(text)), self.tokenizer.tokenize(text))
+
+    def test_text_without_words_gives_one_empty_word(self):
+        for text in ["", "   ", "?!", "(-) <> ..."]:
+            self.assertEqual(self.tokenizer.tokenize(text), [""])
+            self.assertEqual(list(self.tokenizer.iter_tokenize(text)), [""])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+from semsimilar import instrumentation
+from semsimilar.textprocessor.processor import en_stop, stem
+from semsimilar.textprocessor.tokenize import CodeTokenizer
+from semsimilar.textprocessor.wsd import get_synsets
+
+
+class TextPipeline(object):
+    """Text processing pipeline producing every token list of a document in one pass
+
+    Stop words and custom words are filtered with a single frozenset lookup per token, and
+    tokens are stemmed (through the stem cache) and collected for WSD in the same loop. Tokenizers
+    with iter_tokenize (CodeTokenizer) are consumed lazily.
+
+    :param tokenizer: tokenizer object
+    :param custom_words: words to be removed in addition to the stop words
+    :param stop_words: stop words (defaults to the English stop words)
+    :param window: size of the window used for word sense disambiguation
+    :type tokenizer: semsimilar.semsimilar.textprocessor.tokenize.CodeTokenizer, nltk.tokenize.api.* ,...
+    :type custom_words: list<string>
+    :type stop_words: list<string>
+    :type window: int
+    :returns: text pipeline
+    :rtype: semsimilar.semsimilar.textprocessor.pipeline.TextPipeline
+
+    **Property**:
+     - tokenizer
+     - custom_words
+     - stop_words
+     - window
+
+    :Example:
+
+    >>> pipeline = TextPipeline(CodeTokenizer(), custom_words=['p', 'pre', 'code'])
+    >>> tokens, stemmed_tokens, synset_tokens = pipeline.process("Sessions in PHP")
+    >>> pipeline.synsets(synset_tokens)
+    """
+    # Increase when a change to the pipeline changes its output
+    version = 1
+
+    def __init__(self, tokenizer=None, custom_words=(), stop_words=None, window=4):
+        if tokenizer is None:
+            tokenizer = CodeTokenizer()
+        if stop_words is None:
+            stop_words = en_stop
+        self.__tokenizer = tokenizer
+        self.__custom_words = frozenset(custom_words)
+        self.__stop_words = frozenset(stop_words)
+        self.__removed_words = self.__stop_words | self.__custom_words
+        self.__window = window
+
+    @property
+    def tokenizer(self):
+        return self.__tokenizer
+
+    @property
+    def custom_words(self):
+        return self.__custom_words
+
+    @property
+    def stop_words(self):
+        return self.__stop_words
+
+    @property
+    def window(self):
+        return self.__window
+
+    def process(self, text):
+        """Tokenize, filter and stem a text
+
+        :param text: stream of text
+        :type text: string
+        :returns: tokens, stemmed tokens and unique tokens for WSD (in order of appearance)
+        :rtype: (list<string>, list<string>, list<string>)
+        """
+        with instrumentation.timer("pipeline.process"):
+            return self.__process(text)
+
+    def __process(self, text):
+        removed_words = self.__removed_words
+        if not instrumentation.enabled:
+            if hasattr(self.__tokenizer, "iter_tokenize"):
+                words = self.__tokenizer.iter_tokenize(text)
+            else:
+                words = self.__tokenizer.tokenize(text.lower())
+            return self.__filter(words, removed_words)
+        # Tokenize up front so tokenizing and stemming are timed as separate stages
+        with instrumentation.timer("tokenize"):
+            if hasattr(self.__tokenizer, "iter_tokenize"):
+                words = list(self.__tokenizer.iter_tokenize(text))
+            else:
+                words = self.__tokenizer.tokenize(text.lower())
+        with instrumentation.timer("stem"):
+            return self.__filter(words, removed_words)
+
+    @staticmethod
+    def __filter(words, removed_words):
+        tokens = []
+        stemmed_tokens = []
+        synset_tokens = []
+        seen = set()
+        for token in words:
+            if token in removed_words:
+                continue
+            tokens.append(token)
+            stemmed_tokens.append(stem(token))
+            if token not in seen:
+                seen.add(token)
+                synset_tokens.append(token)
+        return tokens, stemmed_tokens, synset_tokens
+
+    def synsets(self, synset_tokens):
+        """Disambiguate tokens returned by process
+
+        :param synset_tokens: unique tokens
+        :type synset_tokens: list<string>
+        :returns: list of synsets
+        :rtype: list<string>
+        """
+        with instrumentation.timer("wsd"):
+            return get_synsets(synset_tokens, self.__window)
@@ -7,16 +7,67 @@ __license__ = "GPL"
 __version__ = "1.0.0"
 __email__ = "uslperera@gmail.com"
 
-import logging
 from nltk.stem.porter import PorterStemmer
 from nltk.stem.snowball import SnowballStemmer
 from nltk.corpus import stopwords
+from semsimilar.cache import LRUCache
+from semsimilar import instrumentation
 
 # en_stop = stop_words.get_stop_words('en')
 en_stop = stopwords.words('english')
+en_stop_set = frozenset(en_stop)
 p_stemmer = PorterStemmer()
 s_stemmer = SnowballStemmer("english")
 
+# Snowball stems keyed on the token, shared by everything running in this process
+stem_cache = LRUCache(max_size=100000)
+
+
+def set_stem_cache(max_size=100000):
+    """Replace the stem cache
+
+    :param max_size: maximum number of tokens kept (0 disables caching)
+    :type max_size: int
+    :returns: the new cache
+    :rtype: semsimilar.semsimilar.cache.LRUCache
+
+    :Example:
+
+    >>> set_stem_cache(500000)
+    """
+    global stem_cache
+    stem_cache = LRUCache(max_size=max_size)
+    return stem_cache
+
+
+def get_stem_cache_stats():
+    """Get hit/miss counters of the stem cache
+
+    :returns: cache statistics
+    :rtype: dict
+    """
+    return stem_cache.stats()
+
+
+def stem(token):
+    """Extract the stem of a token using the stem cache
+
+    :param token: word
+    :type token: string
+    :returns: stem of the word
+    :rtype: string
+
+    :Example:
+
+    >>> stem('sessions')
+    'session'
+    """
+    stemmed = stem_cache.get(token)
+    if stemmed is None:
+        stemmed = s_stemmer.stem(token)
+        stem_cache.put(token, stemmed)
+    return stemmed
+
 
 def remove_stopwords(tokens):
     """Remove stop words in English
@@ -31,12 +82,8 @@ def remove_stopwords(tokens):
     >>> tokens = ['this', 'is', 'a', 'demo']
     >>> remove_stopwords(tokens)
     """
-    logger = logging.getLogger(__name__)
-    logger.info("Stopwords removal started")
-    stopped_tokens = [i for i in tokens if not i in en_stop]
-    logger.debug("Stopped tokens %s", stopped_tokens)
-    logger.info("Stopwords removal finished")
-    return stopped_tokens
+    with instrumentation.timer("stopwords"):
+        return [i for i in tokens if i not in en_stop_set]
 
 
 def stem_tokens(tokens):
@@ -52,12 +99,8 @@ def stem_tokens(tokens):
     >>> tokens = ['this', 'is', 'a', 'demo']
     >>> stem_tokens(tokens)
     """
-    logger = logging.getLogger(__name__)
-    logger.info("Stemming started")
-    stemmed_tokens = [s_stemmer.stem(i) for i in tokens]
-    logger.debug("Stemmed tokens %s", stemmed_tokens)
-    logger.info("Stemming finished")
-    return stemmed_tokens
+    with instrumentation.timer("stem"):
+        return [stem(i) for i in tokens]
 
 
 def remove_custom_words(custom_words, tokens):
@@ -75,9 +118,5 @@ def remove_custom_words(custom_words, tokens):
     >>> tokens = ['this', 'is', 'a', 'demo']
     >>> remove_custom_words(['is'], tokens)
     """
-    logger = logging.getLogger(__name__)
-    logger.info("Custom words removal started")
-    filtered_tokens = [i for i in tokens if not i in custom_words]
-    logger.debug("Tokens after custom words were removed %s", filtered_tokens)
-    logger.info("Custom words removal finished")
-    return filtered_tokens
+    custom_words = frozenset(custom_words)
+    return [i for i in tokens if i not in custom_words]
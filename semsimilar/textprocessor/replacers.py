@@ -22,5 +22,49 @@ class RegexpReplacer(object):
     def replace(self, text):
         s = text
         for (pattern, repl) in self.patterns:
-            s = re.sub(pattern, repl, s)
+            s = pattern.sub(repl, s)
+        return s
+
+
+class ContractionReplacer(object):
+    """Expand contractions with two precompiled regular expressions
+
+    Gives the same output as RegexpReplacer with replacement_patterns on natural text. Whole-word
+    contractions (won't, can't, ...) are replaced with one alternation and a lookup, then the
+    suffix contractions ('ll, n't, ...) with a second one. Runs of the same suffix ("'re're")
+    are all expanded, where the sequential patterns leave some behind.
+    """
+    literals = {
+        "won't": 'will not',
+        "can't": 'cannot',
+        "i'm": 'i am',
+        "ain't": 'is not'
+    }
+    suffixes = {
+        "'ll": ' will',
+        "n't": ' not',
+        "'ve": ' have',
+        "'s": ' is',
+        "'re": ' are',
+        "'d": ' would'
+    }
+
+    def __init__(self):
+        self.literal_pattern = re.compile("|".join(re.escape(literal) for literal in self.literals))
+        self.suffix_pattern = re.compile(r"(\w+)(" + "|".join(re.escape(suffix) for suffix in self.suffixes) + ")")
+
+    def __replace_literal(self, match):
+        return self.literals[match.group(0)]
+
+    def __replace_suffix(self, match):
+        return match.group(1) + self.suffixes[match.group(2)]
+
+    def replace(self, text):
+        if "'" not in text:
+            return text
+        s = self.literal_pattern.sub(self.__replace_literal, text)
+        # Chained contractions (couldn't've) need another pass once the first suffix is expanded
+        count = 1
+        while count and "'" in s:
+            s, count = self.suffix_pattern.subn(self.__replace_suffix, s)
         return s
@@ -8,17 +8,20 @@ __version__ = "1.0.0"
 __email__ = "uslperera@gmail.com"
 
 from nltk.tokenize.api import TokenizerI
-from semsimilar.textprocessor.replacers import RegexpReplacer
+from semsimilar.textprocessor.replacers import ContractionReplacer
 import re
 
 
 class CodeTokenizer(TokenizerI):
     _expression = r"([?!:;\-\(\)\[\]\"/,<>]|(\.\B)|(\s'))"
-    __replacer = RegexpReplacer()
+    _punctuation = re.compile(_expression)
+    _whitespace = re.compile(r"\s+")
+    _separators = re.compile(r"(?:" + _expression + r"|\s)+")
+    __replacer = ContractionReplacer()
 
     def remove_punctuations(self, s):
         """Remove punctuation marks"""
-        return re.sub(self._expression, " ", s).strip()
+        return self._punctuation.sub(" ", s).strip()
 
     def tokenize(self, s):
         """Tokenize a string (Splits the text into words)
@@ -36,7 +39,71 @@ class CodeTokenizer(TokenizerI):
         s = s.lower()
         s = self.remove_punctuations(s)
         s = self.__replacer.replace(s)
-        return re.split("\s+", s)
+        return self._whitespace.split(s)
+
+    def iter_tokenize(self, s):
+        """Tokenize a string lazily
+
+        Gives the same words as tokenize without building the intermediate strings and list,
+        including the single empty word tokenize gives for text without words (e.g. "" or "?!").
+
+        :param s: stream of text
+        :type s: string
+        :returns: words
+        :rtype: generator<string>
+
+        :Example:
+
+        >>> c = CodeTokenizer()
+        >>> list(c.iter_tokenize("Stream of text 123"))
+        ['stream', 'of', 'text', '123']
+        """
+        empty = True
+        for token, start, end in self.iter_spans(s):
+            empty = False
+            yield token
+        if empty:
+            yield ""
 
     def span_tokenize(self, s):
-        pass
+        """Get the offsets of the words in the original string
+
+        Words expanded from a contraction (don't -> do, not) share the span of the contraction.
+
+        :param s: stream of text
+        :type s: string
+        :returns: start and end offsets of each word
+        :rtype: generator<(int, int)>
+
+        :Example:
+
+        >>> c = CodeTokenizer()
+        >>> list(c.span_tokenize("Stream of text"))
+        [(0, 6), (7, 9), (10, 14)]
+        """
+        for token, start, end in self.iter_spans(s):
+            yield start, end
+
+    def iter_spans(self, s):
+        """Get the words of a string with their offsets in the original string
+
+        :param s: stream of text
+        :type s: string
+        :returns: word, start and end offsets
+        :rtype: generator<(string, int, int)>
+        """
+        start = 0
+        for match in self._separators.finditer(s):
+            if match.start() > start:
+                for token in self.__expand(s[start:match.start()]):
+                    yield token, start, match.start()
+            start = match.end()
+        if start < len(s):
+            for token in self.__expand(s[start:]):
+                yield token, start, len(s)
+
+    def __expand(self, word):
+        word = word.lower()
+        if "'" in word:
+            return self.__replacer.replace(word).split()
+        return (word,)
@@ -7,17 +7,242 @@ __license__ = "GPL"
 __version__ = "1.0.0"
 __email__ = "uslperera@gmail.com"
 
-import logging
+import os
+import tempfile
+from nltk.corpus import wordnet as wn
 from nltk.wsd import lesk
+from semsimilar.cache import LRUCache
+from semsimilar import instrumentation
 
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
 
-def get_synsets(tokens, window):
+try:
+    from os import replace
+except ImportError:
+    # Python 2, where rename replaces existing files on POSIX
+    from os import rename as replace
+
+# Disambiguated synset names keyed on (disambiguator name, token, window tuple)
+synset_cache = LRUCache(max_size=200000)
+
+_missing = object()
+
+
+def nltk_lesk(context, token):
+    """Disambiguate a word with nltk.wsd.lesk
+
+    :param context: words around the token
+    :param token: word to disambiguate
+    :type context: list<string>
+    :type token: string
+    :returns: name of the synset or None
+    :rtype: string
+    """
+    synset = lesk(context, token)
+    if synset is not None:
+        return synset.name()
+    return None
+
+
+class SignatureIndex(object):
+    """Simplified Lesk disambiguator backed by precomputed gloss signatures
+
+    Keeps the candidate synsets of each word together with a frozen set of the words in their
+    definitions, so a lookup is only a set intersection per candidate. The chosen synsets are
+    the same as nltk.wsd.lesk (first candidate with the highest overlap wins).
+
+    Words are indexed on first use. Call build to index the whole WordNet vocabulary upfront.
+
+    :returns: signature index
+    :rtype: semsimilar.semsimilar.textprocessor.wsd.SignatureIndex
+
+    :Example:
+
+    >>> index = SignatureIndex()
+    >>> index(['deposit', 'money', 'bank'], 'bank')
+    'depository_financial_institution.n.01'
+    """
+
+    def __init__(self):
+        self.__candidates = {}
+        self.__signatures = {}
+
+    def __len__(self):
+        return len(self.__candidates)
+
+    def __call__(self, context, token):
+        return self.disambiguate(context, token)
+
+    def candidates(self, token):
+        """Get (synset name, signature) pairs of a word in WordNet order
+
+        :param token: word
+        :type token: string
+        :returns: candidate synsets with their signatures
+        :rtype: tuple<(string, frozenset<string>)>
+        """
+        candidates = self.__candidates.get(token)
+        if candidates is None:
+            candidates = tuple((synset.name(), self.__signature(synset)) for synset in wn.synsets(token))
+            self.__candidates[token] = candidates
+        return candidates
+
+    def __signature(self, synset):
+        name = synset.name()
+        signature = self.__signatures.get(name)
+        if signature is None:
+            signature = frozenset(synset.definition().split())
+            self.__signatures[name] = signature
+        return signature
+
+    def build(self, words=None):
+        """Index words upfront
+
+        :param words: words to index (defaults to every lemma name in WordNet)
+        :type words: list<string>
+        :returns: void
+        """
+        if words is None:
+            words = wn.all_lemma_names()
+        for word in words:
+            self.candidates(word)
+
+    def save(self, path):
+        """Write the index to a file so it can be loaded without reading WordNet
+
+        The index is written to a temporary file moved into place, so a crash while writing does
+        not leave a truncated file behind.
+
+        :param path: file to write
+        :type path: string
+        :returns: void
+        """
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                             prefix=os.path.basename(path) + ".")
+        try:
+            with os.fdopen(handle, "wb") as index_file:
+                pickle.dump(self.__candidates, index_file, pickle.HIGHEST_PROTOCOL)
+            replace(temp_path, path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    def load(self, path):
+        """Read an index written with save
+
+        :param path: file to read
+        :type path: string
+        :returns: void
+        """
+        with open(path, "rb") as index_file:
+            candidates = pickle.load(index_file)
+        for token, pairs in candidates.items():
+            self.__candidates[token] = pairs
+            for name, signature in pairs:
+                self.__signatures[name] = signature
+
+    def disambiguate(self, context, token):
+        """Get the synset of the token whose definition overlaps most with the context
+
+        :param context: words around the token
+        :param token: word to disambiguate
+        :type context: list<string>
+        :type token: string
+        :returns: name of the synset or None
+        :rtype: string
+        """
+        candidates = self.candidates(token)
+        if not candidates:
+            return None
+        context = frozenset(context)
+        best_name, best_score = None, -1
+        for name, signature in candidates:
+            score = len(context & signature)
+            if score > best_score:
+                best_name, best_score = name, score
+        return best_name
+
+
+# Disambiguator used by get_synsets when none is given
+disambiguator = nltk_lesk
+
+
+def set_disambiguator(method):
+    """Set the default disambiguator of get_synsets
+
+    .. note:: Possible disambiguators are nltk_lesk, SignatureIndex() or any callable taking (context, token) and returning a synset name
+    .. note:: synset_cache keeps the choices of each disambiguator apart, by the name of its function or class.
+
+    :param method: disambiguator
+    :type method: callable
+    :returns: void
+
+    :Example:
+
+    >>> set_disambiguator(SignatureIndex())
+    """
+    global disambiguator
+    disambiguator = method
+
+
+def get_disambiguator_name(method=None):
+    """Get the name synset_cache keeps the choices of a disambiguator under
+
+    :param method: disambiguator (defaults to the one set with set_disambiguator)
+    :type method: callable
+    :returns: module and name of its function or class
+    :rtype: string
+
+    :Example:
+
+    >>> get_disambiguator_name()
+    'semsimilar.textprocessor.wsd.nltk_lesk'
+    """
+    return __method_name(method or disambiguator)
+
+
+def set_cache(max_size=200000, path=None):
+    """Replace the synset cache
+
+    :param max_size: maximum number of (token, window) entries kept (0 disables caching)
+    :param path: file used to persist the cache, loaded if it exists
+    :type max_size: int
+    :type path: string
+    :returns: the new cache
+    :rtype: semsimilar.semsimilar.cache.LRUCache
+
+    :Example:
+
+    >>> set_cache(500000, "synsets.cache")
+    """
+    global synset_cache
+    synset_cache = LRUCache(max_size=max_size, path=path)
+    return synset_cache
+
+
+def get_cache_stats():
+    """Get hit/miss counters of the synset cache
+
+    :returns: cache statistics
+    :rtype: dict
+    """
+    return synset_cache.stats()
+
+
+def get_synsets(tokens, window, method=None):
     """Get synsets for the tokens passed
 
+    Results are memoized per disambiguator, token and context window in synset_cache.
+
     :param tokens: list of words
     :param window: size of the window
+    :param method: disambiguator (defaults to the one set with set_disambiguator)
     :type tokens: list<string>
     :type window: int
+    :type method: callable
     :returns: list of synsets
     :rtype: list<string>
 
@@ -26,48 +251,68 @@ def get_synsets(tokens, window):
     >>> tokens = ['this', 'is', 'a', 'demo']
     >>> get_synsets(tokens, 2)
     """
-    logger = logging.getLogger(__name__)
-    logger.info("Retrieving synsets started")
     window = validate_window(window)
+    method = method or disambiguator
+    method_name = __method_name(method)
+    tokens = tuple(tokens)
     synsets = []
-    for token in tokens:
-        sentence = generate_window(window, tokens, token)
-        synset = lesk(sentence, token)
-        if synset is not None:
-            synsets.append(synset.name())
-        else:
-            synsets.append(None)
-    logger.debug("Tokens - %s Synsets - %s", tokens, synsets)
-    logger.info("Retrieving synsets finished")
+    for index, start, end in generate_windows(window, len(tokens)):
+        token = tokens[index]
+        sentence = tokens[start:end]
+        key = (method_name, token, sentence)
+        name = synset_cache.get(key, _missing)
+        if name is _missing:
+            with instrumentation.timer("wsd.disambiguate"):
+                name = method(sentence, token)
+            synset_cache.put(key, name)
+        synsets.append(name)
+    instrumentation.increment("wsd.tokens", len(tokens))
     return synsets
 
 
+def __method_name(method):
+    """Get a name of a disambiguator that stays the same across processes (for persisted caches)"""
+    name = getattr(method, "__name__", None)
+    if name is None:
+        name = type(method).__name__
+    return getattr(method, "__module__", "") + "." + name
+
+
+def generate_windows(window, length):
+    """Generate the windows of every position in a single pass
+
+    Each window holds window + 1 tokens centred on the position, shifted to stay inside the text.
+
+    :param window: size of the window
+    :param length: number of tokens
+    :type window: int
+    :type length: int
+    :returns: position of the token and slice bounds of its window
+    :rtype: generator<(int, int, int)>
+
+    :Example:
+
+    >>> list(generate_windows(2, 4))
+    [(0, 0, 3), (1, 0, 3), (2, 1, 4), (3, 1, 4)]
+    """
+    if length < window + 1:
+        for index in range(length):
+            yield index, 0, length
+        return
+    half = window // 2
+    last = length - window - 1
+    for index in range(length):
+        start = min(max(index - half, 0), last)
+        yield index, start, start + window + 1
+
+
 def generate_window(window, tokens, target):
     """Generate window to disambiguate words"""
-    logger = logging.getLogger(__name__)
-    logger.info("Generating window")
-    new_tokens = []
     index = tokens.index(target)
-    right = 0
     if len(tokens) < window + 1:
         return tokens
-    # if index of the target word is greater than or equal to half of the windows size
-    if index >= (window / 2):
-        left = index - (window / 2)
-    else:
-        left = 0
-        right = (window / 2) - index
-    # if index of the target
-    if (index + right + (window / 2)) < len(tokens):
-        right = index + right + (window / 2) + 1
-    else:
-        right = len(tokens)
-        left -= (index + (window / 2) + 1) - len(tokens)
-    for num in range(left, right):
-        new_tokens.append(tokens[num])
-    logger.debug("Window of token %s is %s", target, new_tokens)
-    logger.info("Window generated")
-    return new_tokens
+    start = min(max(index - window // 2, 0), len(tokens) - window - 1)
+    return tokens[start:start + window + 1]
 
 
 def validate_window(window):
@@ -0,0 +1,67 @@
+#!/usr/bin/python
+# -*- coding: ascii -*-
+
+__author__ = "Shamal Perera"
+__copyright__ = "Copyright 2016, SemSimilar Project"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__email__ = "uslperera@gmail.com"
+
+import logging
+import os
+import timeit
+from nltk.corpus import wordnet as wn
+from semsimilar.textprocessor import processor, wsd
+from semsimilar.textprocessor.tokenize import CodeTokenizer
+
+
+def warm_up(snapshot=None, signature_index=False):
+    """Load WordNet, stop words, stemmers and optionally the WSD index before serving
+
+    NLTK loads WordNet lazily, so without this the first documents or queries processed in a
+    process pay for reading the corpus. Call it once per process (or before forking workers).
+    The disambiguator of get_synsets is only changed if signature_index is set, as a signature
+    index can choose other synsets than nltk_lesk.
+
+    :param snapshot: file holding a saved signature index, created if it does not exist
+    :param signature_index: load (or build) a signature index and make it the disambiguator of
+                            semsimilar.semsimilar.textprocessor.wsd.get_synsets
+    :type snapshot: string
+    :type signature_index: bool
+    :returns: seconds taken
+    :rtype: float
+
+    :Example:
+
+    >>> warm_up("wordnet.index", signature_index=True)
+    """
+    logger = logging.getLogger(__name__)
+    logger.info("Warm up started")
+    start = timeit.default_timer()
+
+    # Reading a lemma and a path similarity forces the lazy corpus reader to parse its files
+    entity = wn.synset("entity.n.01")
+    for synset in wn.synsets("document"):
+        synset.path_similarity(entity)
+        synset.definition()
+
+    processor.remove_stopwords(["warm", "up"])
+    processor.s_stemmer.stem("warming")
+    processor.p_stemmer.stem("warming")
+    CodeTokenizer().tokenize("Warm up")
+
+    if signature_index:
+        index = wsd.SignatureIndex()
+        if snapshot is not None and os.path.exists(snapshot):
+            logger.info("Loading signature index from %s", snapshot)
+            index.load(snapshot)
+        else:
+            index.build()
+            if snapshot is not None:
+                logger.info("Saving signature index to %s", snapshot)
+                index.save(snapshot)
+        wsd.set_disambiguator(index)
+
+    elapsed = timeit.default_timer() - start
+    logger.info("Warm up finished in %s seconds", elapsed)
+    return elapsed